@@ -7,16 +7,12 @@ import perrot
 
 # prepare data
 count = 25
-data = []
+x_data = numpy.linspace(-numpy.pi, numpy.pi, count)
+y_data = numpy.linspace(-numpy.pi, numpy.pi, count)
 
-for x in numpy.linspace(-numpy.pi, numpy.pi, count):
-    for y in numpy.linspace(-numpy.pi, numpy.pi, count):
-        z = (numpy.sin(x) + numpy.sin(y))/2
-        data.append((x/numpy.pi, y/numpy.pi, z))
-
-data = numpy.array(data)
-z_min = numpy.min(data[:, 2])
-z_max = numpy.max(data[:, 2])
+data = (numpy.sin(x_data)[numpy.newaxis, :] + numpy.sin(y_data)[:, numpy.newaxis])/2
+z_min = numpy.min(data)
+z_max = numpy.max(data)
 
 # init plot
 plot = perrot.plot.Plot(
@@ -47,15 +43,12 @@ plot.add(z_axis)
 plot.map(color_bar, z_axis, scale='scale')
 
 # add series
-series = perrot.plot.Rects(
+step = 1/(count-1)
+series = perrot.plot.Heatmap(
     data = data,
-    x = lambda d: d[0],
-    y = lambda d: d[1],
-    width = 2/(count-1),
-    height = 2/(count-1),
-    margin = 0,
-    line_width = 0,
-    fill_color = lambda d: color_bar.convert(d[2]))
+    x_extent = (-1-step, 1+step),
+    y_extent = (-1-step, 1+step),
+    color_bar = color_bar)
 
 plot.plot(series)
 
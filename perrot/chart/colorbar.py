@@ -1,12 +1,14 @@
 #  Created byMartin.cz
 #  Copyright (c) Martin Strohalm. All rights reserved.
 
+import numpy
 from pero.properties import *
 from pero import colors
 from pero import ColorBar as ColorBarGlyph
 from pero import ContinuousScale, LinScale
 
 from .. enums import *
+from .. lut import make_lut, convert_values
 from .graphics import OutGraphics
 
 
@@ -15,6 +17,9 @@ class ColorBar(OutGraphics):
     ColorBar provides a wrapper for the pero.ColorBar glyph to visualize a color
     gradient range used to colorize data within a chart.
     
+    ColorBar can also be used directly as a gradient scale to convert input
+    values into colors by calling the 'convert' method.
+    
     Properties:
         
         scale: pero.ContinuousScale
@@ -66,6 +71,12 @@ class ColorBar(OutGraphics):
         
         # init glyph
         self._glyph = ColorBarGlyph()
+        
+        # init lookup table
+        self._lut = None
+        
+        # bind events
+        self.bind(EVT_PROPERTY_CHANGED, self._on_colorbar_property_changed)
     
     
     def get_extent(self, canvas, source=UNDEF, **overrides):
@@ -91,6 +102,55 @@ class ColorBar(OutGraphics):
         self._glyph.draw(canvas)
     
     
+    def convert(self, value):
+        """
+        Converts given value into color according to current gradient and scale.
+        
+        If a sequence of values is given, the colors are taken at once from the
+        precomputed lookup table of the gradient (see 'lut') and returned as an
+        array of RGBA values. In such case, values outside the range are
+        clipped and missing values (NaN) are converted to transparent color.
+        
+        Args:
+            value: float, (float,) or numpy.ndarray
+                Value(s) to convert in real data units.
+        
+        Returns:
+            pero.Color or numpy.ndarray
+                Corresponding color or array of RGBA values.
+        """
+        
+        # convert values at once
+        if isinstance(value, (numpy.ndarray, list, tuple)):
+            return convert_values(self.lut, self.scale, value)
+        
+        # normalize value by current scale
+        norm = self.scale.normalize(value)
+        
+        # convert normalized value into color
+        return self.gradient.color_at(norm)
+    
+    
+    @property
+    def lut(self):
+        """
+        Gets the lookup table of current gradient colors sampled regularly
+        within normalized range 0-1. The last item is transparent color used
+        for missing values. The table is created on first use and kept until
+        the gradient is changed.
+        
+        Returns:
+            numpy.ndarray
+                Gradient colors as 2D array of RGBA values.
+        """
+        
+        # make table
+        if self._lut is None:
+            self._lut = make_lut(self.gradient)
+        
+        return self._lut
+    
+    
     def _update_glyph(self, canvas=None, source=UNDEF, **overrides):
         """Updates colorbar glyph."""
         
@@ -115,3 +175,11 @@ class ColorBar(OutGraphics):
         self._glyph.orientation = orientation
         self._glyph.reverse = orientation == ORI_VERTICAL
         self._glyph.length = length
+    
+    
+    def _on_colorbar_property_changed(self, evt):
+        """Called after any property has changed."""
+        
+        # reset lookup table
+        if evt.name == 'gradient':
+            self._lut = None
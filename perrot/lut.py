@@ -0,0 +1,68 @@
+#  Created byMartin.cz
+#  Copyright (c) Martin Strohalm. All rights reserved.
+
+import numpy
+
+# define constants
+LUT_SIZE = 1024
+
+
+def make_lut(gradient, size=LUT_SIZE):
+    """
+    Creates lookup table of given gradient colors sampled regularly within
+    normalized range 0-1. The last item is transparent color used for missing
+    values.
+    
+    Args:
+        gradient: pero.Gradient
+            Color gradient to sample.
+        
+        size: int
+            Number of gradient samples.
+    
+    Returns:
+        numpy.ndarray
+            Gradient colors as read-only 2D array of RGBA values.
+    """
+    
+    lut = [gradient.color_at(x).rgba for x in numpy.linspace(0., 1., size)]
+    lut.append((0, 0, 0, 0))
+    
+    lut = numpy.array(lut, dtype=numpy.uint8)
+    lut.flags.writeable = False
+    
+    return lut
+
+
+def convert_values(lut, scale, values):
+    """
+    Converts given values into colors at once using the lookup table created
+    by the 'make_lut' function. Values outside the scale range are clipped and
+    missing values (NaN) are converted to transparent color.
+    
+    Args:
+        lut: numpy.ndarray
+            Gradient lookup table.
+        
+        scale: pero.ContinuousScale
+            Scale to normalize the values.
+        
+        values: (float,) or numpy.ndarray
+            Values to convert in real data units.
+    
+    Returns:
+        numpy.ndarray
+            Corresponding colors as array of RGBA values.
+    """
+    
+    size = len(lut) - 1
+    
+    # normalize values by scale
+    norm = scale.normalize(numpy.asarray(values, dtype=numpy.float64))
+    
+    # get table indices
+    idx = numpy.rint(numpy.clip(norm, 0., 1.) * (size - 1))
+    idx[numpy.isnan(idx)] = size
+    
+    # get colors
+    return lut.take(idx.astype(int), axis=0)
@@ -2,7 +2,7 @@
 #  Copyright (c) Martin Strohalm. All rights reserved.
 
 from .annotation import Annotation
-from .axes import Axis, LinAxis, LogAxis, OrdinalAxis, TimeAxis
+from .axes import Axis, LinAxis, LogAxis, OrdinalAxis, OrdinalEncoder, TimeAxis
 from .colorbar import ColorBar
 # import control
 from .control import PlotControl
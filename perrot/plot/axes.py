@@ -1,6 +1,8 @@
 #  Created byMartin.cz
 #  Copyright (c) Martin Strohalm. All rights reserved.
 
+import numpy
+
 from pero.enums import *
 from pero.properties import *
 from pero import StraitAxis
@@ -649,6 +651,130 @@ class LogAxis(Axis):
             self._update_base()
 
 
+class OrdinalEncoder(OrdinalScale):
+    """
+    Ordinal encoder is a specific type of pero.OrdinalScale used by the
+    perrot.plot.OrdinalAxis to map categories into their indices. In addition
+    to the standard scaling of individual values, whole sequences of
+    categories are encoded at once using vectorized lookup. Same as for the
+    standard scaling, repeated labels are encoded by their last occurrence.
+    Unknown categories and labels without output value are encoded as NaN.
+    
+    The lookup tables are created for current 'in_range' labels and reused
+    until the labels change. If the 'implicit' or 'recycle' property is
+    enabled, standard element-wise scaling is used instead.
+    """
+    
+    
+    def __init__(self, **overrides):
+        """Initializes a new instance of OrdinalEncoder."""
+        
+        super().__init__(**overrides)
+        
+        # init lookup
+        self._lookup_labels = None
+        self._lookup_index = None
+        self._lookup_sorted = None
+        self._lookup_codes = None
+    
+    
+    def scale(self, value, *args, **kwargs):
+        """
+        Returns corresponding output value for given input value.
+        
+        Args:
+            value: any or (any,)
+                Input value to be scaled.
+        
+        Returns:
+            any or numpy.ndarray
+                Scaled value.
+        """
+        
+        # encode arrays
+        if isinstance(value, (numpy.ndarray, list, tuple)) and not (self.implicit or self.recycle):
+            return self.encode(value)
+        
+        return super().scale(value, *args, **kwargs)
+    
+    
+    def encode(self, values):
+        """
+        Encodes given categories into output values.
+        
+        Args:
+            values: (any,) or numpy.ndarray
+                Categories to encode.
+        
+        Returns:
+            numpy.ndarray
+                Encoded values as floats.
+        """
+        
+        # keep mixed types
+        if not isinstance(values, numpy.ndarray):
+            array = numpy.asarray(values)
+            if array.dtype.kind in 'US' and not all(isinstance(v, str) for v in values):
+                array = numpy.array(values, dtype=object)
+            values = array
+        
+        # init lookup
+        labels = tuple(self.in_range)
+        if self._lookup_labels != labels:
+            self._init_lookup(labels)
+        
+        # check values
+        if len(values) == 0 or len(labels) == 0:
+            return numpy.full(len(values), numpy.nan)
+        
+        # search sorted strings
+        if self._lookup_sorted is not None and values.dtype.kind in 'US':
+            
+            idx = numpy.searchsorted(self._lookup_sorted, values)
+            idx = numpy.minimum(idx, len(self._lookup_sorted)-1)
+            
+            match = self._lookup_sorted[idx] == values
+            
+            return numpy.where(match, self._lookup_codes[idx], numpy.nan)
+        
+        # get unique values
+        try:
+            uniques, inverse = numpy.unique(values, return_inverse=True)
+        except TypeError:
+            uniques, inverse = values, numpy.arange(len(values))
+        
+        # encode unique values only
+        index = self._lookup_index
+        codes = numpy.array([index.get(v, numpy.nan) for v in uniques.tolist()], dtype=numpy.float64)
+        
+        return codes[inverse.reshape(-1)]
+    
+    
+    def _init_lookup(self, labels):
+        """Initializes lookup tables for given labels."""
+        
+        # init output values
+        values = numpy.full(len(labels), numpy.nan)
+        count = min(len(labels), len(self.out_range))
+        values[:count] = numpy.array(self.out_range[:count], dtype=numpy.float64)
+        
+        # init index using last occurrence of labels
+        self._lookup_labels = labels
+        self._lookup_index = {label: values[i] for i, label in enumerate(labels)}
+        
+        # init sorted strings
+        self._lookup_sorted = None
+        self._lookup_codes = None
+        
+        if labels and all(isinstance(l, str) for l in labels):
+            
+            array = numpy.array(labels)[::-1]
+            uniques, first = numpy.unique(array, return_index=True)
+            
+            self._lookup_sorted = uniques
+            self._lookup_codes = values[::-1][first]
+
+
 class OrdinalAxis(Axis):
     """
     Predefined axis for categorical data.
@@ -706,7 +832,7 @@ class OrdinalAxis(Axis):
         full_range = (-0.5, count-0.5)
         
         # make mapper
-        self.mapper = OrdinalScale(
+        self.mapper = OrdinalEncoder(
             in_range = self.labels,
             out_range = mapper_values,
             default = UNDEF,
@@ -1,6 +1,7 @@
 #  Created byMartin.cz
 #  Copyright (c) Martin Strohalm. All rights reserved.
 
+import numpy
 from pero.enums import *
 from pero.properties import *
 from pero import colors
@@ -8,6 +9,7 @@ from pero import ColorBar as ColorBarGlyph
 from pero import ContinuousScale, LinScale
 
 from .graphics import OutGraphics
+from ..lut import make_lut, convert_values
 
 
 class ColorBar(OutGraphics):
@@ -72,6 +74,12 @@ class ColorBar(OutGraphics):
         
         # init glyph
         self._glyph = ColorBarGlyph()
+        
+        # init lookup table
+        self._lut = None
+        
+        # bind events
+        self.bind(EVT_PROPERTY_CHANGED, self._on_colorbar_property_changed)
     
     
     def get_extent(self, canvas):
@@ -118,17 +126,54 @@ class ColorBar(OutGraphics):
         """
         Converts given value into color according to current gradient and scale.
         
+        If a sequence of values is given, the colors are taken at once from the
+        precomputed lookup table of the gradient (see 'lut') and returned as an
+        array of RGBA values. In such case, values outside the range are
+        clipped and missing values (NaN) are converted to transparent color.
+        
         Args:
-            value: float
-                Value to convert in real data units.
+            value: float, (float,) or numpy.ndarray
+                Value(s) to convert in real data units.
         
         Returns:
-            pero.Color
-                Corresponding color.
+            pero.Color or numpy.ndarray
+                Corresponding color or array of RGBA values.
         """
         
+        # convert values at once
+        if isinstance(value, (numpy.ndarray, list, tuple)):
+            return convert_values(self.lut, self.scale, value)
+        
         # normalize value by current scale
         norm = self.scale.normalize(value)
         
         # convert normalized value into color
         return self.gradient.color_at(norm)
+    
+    
+    @property
+    def lut(self):
+        """
+        Gets the lookup table of current gradient colors sampled regularly
+        within normalized range 0-1. The last item is transparent color used
+        for missing values. The table is created on first use and kept until
+        the gradient is changed.
+        
+        Returns:
+            numpy.ndarray
+                Gradient colors as 2D array of RGBA values.
+        """
+        
+        # make table
+        if self._lut is None:
+            self._lut = make_lut(self.gradient)
+        
+        return self._lut
+    
+    
+    def _on_colorbar_property_changed(self, evt):
+        """Called after any property has changed."""
+        
+        # reset lookup table
+        if evt.name == 'gradient':
+            self._lut = None
@@ -21,6 +21,11 @@ MEASURE_X = 'x'
 MEASURE_Y = 'y'
 MEASURE_AUTO = 'auto'
 
+STORAGE_FLOAT64 = 'float64'
+STORAGE_FLOAT32 = 'float32'
+STORAGE_INT32 = 'int32'
+STORAGE_INT16 = 'int16'
+
 # define zoom tool modes
 ZOOM_MODE = Enum(
     X = ZOOM_X,
@@ -33,3 +38,10 @@ MEASURE_MODE = Enum(
     X = MEASURE_X,
     Y = MEASURE_Y,
     AUTO = MEASURE_AUTO)
+
+# define series data storage types
+STORAGE = Enum(
+    FLOAT64 = STORAGE_FLOAT64,
+    FLOAT32 = STORAGE_FLOAT32,
+    INT32 = STORAGE_INT32,
+    INT16 = STORAGE_INT16)
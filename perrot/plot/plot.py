@@ -12,7 +12,7 @@ from .grid import Grid
 from .labels import Labels
 from .legend import Legend
 from .rangebar import RangeBar
-from .series import Series
+from .series import Rolling, Series
 from .title import Title
 
 
@@ -199,6 +199,9 @@ class Plot(Graphics):
         self._series = []
         self._annots = []
         self._mapping = {}
+        self._limits = {}
+        self._graph = None
+        self._follow = None
         self._frame = Frame(0, 0, 1, 1)
 
         # register main graphics
@@ -332,6 +335,10 @@ class Plot(Graphics):
         dimension (e.g. provide x_range to get minimum and maximum values of the
         cropped data in y dimension).
         
+        The full range limits are cached until any object is added, removed or
+        mapped or the revision of any series is changed. Limits using custom
+        mapping functions are never cached.
+        
         Args:
             axis: str or perrot.plot.Axis
                 Axis's unique tag or the axis itself.
@@ -362,6 +369,17 @@ class Plot(Graphics):
         if not isinstance(axis, Axis):
             axis = self._graphics[axis]
 
+        # use cached limits
+        key = None
+        if x_range is None and y_range is None:
+
+            key = (axis.tag, axis.position, exact)
+            revisions = tuple(s.revision for s in self._series)
+
+            cached = self._limits.get(key, None)
+            if cached is not None and cached[0] == revisions:
+                return cached[1]
+
         # add series
         for series in self._series:
 
@@ -382,6 +400,8 @@ class Plot(Graphics):
             # use specific function
             if mapping['limits'] is not None:
 
+                key = None
+
                 limits = mapping['limits'](x_range, y_range, exact)
                 if limits is None:
                     continue
@@ -408,6 +428,10 @@ class Plot(Graphics):
             if maximum is None or hi > maximum:
                 maximum = hi
 
+        # store cache
+        if key is not None:
+            self._limits[key] = (revisions, (minimum, maximum))
+
         return minimum, maximum
 
     def get_parent_axes(self, axis):
@@ -429,38 +453,8 @@ class Plot(Graphics):
         if not isinstance(axis, Axis):
             axis = self._graphics[axis]
 
-        # init buffer
-        parents = set()
-
-        # check series
-        for series in self._series:
-
-            # skip invisible
-            if not series.visible:
-                continue
-
-            # get series axes
-            mappings = self._mapping.get(series.tag, {})
-
-            # check if dependent
-            if axis.tag not in mappings:
-                continue
-
-            # get parents
-            for item_tag in mappings:
-
-                # check same axis
-                if item_tag == axis.tag:
-                    continue
-
-                # get axis
-                item = self._graphics[item_tag]
-
-                # check if parent
-                if item.level < axis.level:
-                    parents.add(item)
-
-        return list(parents)
+        # get parents
+        return self._get_axes_graph()[1][axis.tag][:]
 
     def get_child_axes(self, axis):
         """
@@ -481,38 +475,8 @@ class Plot(Graphics):
         if not isinstance(axis, Axis):
             axis = self._graphics[axis]
 
-        # init buffer
-        children = set()
-
-        # check series
-        for series in self._series:
-
-            # skip invisible
-            if not series.visible:
-                continue
-
-            # get series axes
-            mappings = self._mapping.get(series.tag, {})
-
-            # check if dependent
-            if axis.tag not in mappings:
-                continue
-
-            # get children
-            for item_tag in mappings:
-
-                # check same axis
-                if item_tag == axis.tag:
-                    continue
-
-                # get axis
-                item = self._graphics[item_tag]
-
-                # check if child
-                if item.level > axis.level:
-                    children.add(item)
-
-        return list(children)
+        # get children
+        return self._get_axes_graph()[2][axis.tag][:]
 
     def draw(self, canvas, source=UNDEF, **overrides):
         """Uses given canvas to draw the plot."""
@@ -529,6 +493,9 @@ class Plot(Graphics):
         if height is UNDEF:
             height = canvas.viewport.height
 
+        # follow newest data
+        self._follow_data()
+
         # init objects
         self._init_frames(canvas, source, overrides)
         self._init_objects(canvas, source, overrides)
@@ -617,6 +584,10 @@ class Plot(Graphics):
         if obj.z_index is UNDEF:
             self._init_z_index(obj)
 
+        # reset caches
+        self._limits.clear()
+        self._graph = None
+
         # add object
         self._graphics[obj.tag] = obj
 
@@ -677,6 +648,10 @@ class Plot(Graphics):
         # remove graphics
         del self._graphics[tag]
 
+        # reset caches
+        self._limits.clear()
+        self._graph = None
+
     def map(self, obj, axis, scale=None, limits=None):
         """
         Maps object to specific axis to share and update the scale.
@@ -741,6 +716,10 @@ class Plot(Graphics):
         # store new mapping
         self._mapping[obj.tag] = mapping
 
+        # reset caches
+        self._limits.clear()
+        self._graph = None
+
     def annotate(self, annotation, x_axis='x_axis', y_axis='y_axis', **overrides):
         """
         This method provides a convenient way to add annotations to the plot.
@@ -893,7 +872,9 @@ class Plot(Graphics):
     def finalize_zoom(self, axes):
         """
         For each given axis this method finalizes all child axes according to
-        individual settings (e.g. autoscale).
+        individual settings (e.g. autoscale). The dependencies of the axes are
+        cached until any object is added, removed or mapped or the visibility
+        of any series or the level of any axis is changed.
         
         Args:
             axes: (str,) or (perrot.plot.Axis,)
@@ -910,13 +891,12 @@ class Plot(Graphics):
             if not isinstance(axis, Axis):
                 axes[i] = self._graphics[axis]
 
-        # ensure unique and sort
-        axes = list(set(axes))
-        axes.sort(key=lambda a: a.level)
+        # get axes graph
+        order, parents, children = self._get_axes_graph()
 
-        # get all related axes
-        related = list(set(c for p in axes for c in self.get_child_axes(p)))
-        related.sort(key=lambda a: a.level)
+        # get all related axes in level order
+        related = set(c.tag for p in axes for c in children[p.tag])
+        related = [a for a in order if a.tag in related]
 
         # init already changed
         changed = set([a.tag for a in axes])
@@ -929,15 +909,14 @@ class Plot(Graphics):
                 continue
 
             # get parent axes
-            parents = self.get_parent_axes(axis)
-            if not parents:
+            if not parents[axis.tag]:
                 continue
 
             # get crop
             x_range = None
             y_range = None
 
-            for parent in parents:
+            for parent in parents[axis.tag]:
 
                 if parent.position in (POS_TOP, POS_BOTTOM):
                     x_range = parent.scale.in_range
@@ -1112,6 +1091,104 @@ class Plot(Graphics):
         # show viewer
         control.show(title, width, height, backend, **options)
 
+    def _follow_data(self):
+        """Shifts following axes if any following series has changed."""
+
+        # get revisions of following series
+        revisions = tuple((s.tag, s.revision) for s in self._series if isinstance(s, Rolling) and s.visible and s.follow)
+
+        # check changes
+        if revisions == self._follow:
+            return
+
+        self._follow = revisions
+
+        # shift following axes to newest data
+        axes = []
+        for axis in self._axes:
+
+            if not self._is_following(axis):
+                continue
+
+            range_max = self.get_series_limits(axis)[1]
+            if range_max is None:
+                continue
+
+            start, end = axis.scale.in_range
+            shift = range_max - end
+
+            self.finalize_axis(axis, start + shift, end + shift)
+            axes.append(axis)
+
+        # update dependent axes
+        if axes:
+            self.finalize_zoom(axes)
+
+    def _is_following(self, axis):
+        """Checks whether given axis should follow the newest data."""
+
+        # check axis
+        if axis.position not in (POS_TOP, POS_BOTTOM):
+            return False
+
+        # check series
+        for series in self._series:
+
+            if not isinstance(series, Rolling) or not series.visible or not series.follow:
+                continue
+
+            if axis.tag in self._mapping.get(series.tag, {}):
+                return True
+
+        return False
+
+    def _get_axes_graph(self):
+        """Gets cached level order of axes and their parents and children."""
+
+        # check cache
+        state = (
+            tuple(s.visible for s in self._series),
+            tuple(a.level for a in self._axes))
+
+        if self._graph is not None and self._graph[0] == state:
+            return self._graph[1]
+
+        # init graph
+        order = sorted(self._axes, key=lambda a: a.level)
+        parents = {a.tag: set() for a in order}
+        children = {a.tag: set() for a in order}
+
+        # check series
+        for series in self._series:
+
+            # skip invisible
+            if not series.visible:
+                continue
+
+            # get series axes
+            items = [self._graphics[t] for t in self._mapping.get(series.tag, {})]
+
+            # add dependencies
+            for axis in items:
+                for item in items:
+
+                    if item.level < axis.level:
+                        parents[axis.tag].add(item)
+
+                    elif item.level > axis.level:
+                        children[axis.tag].add(item)
+
+        # sort by level
+        for deps in (parents, children):
+            for tag in deps:
+                deps[tag] = [a for a in order if a in deps[tag]]
+
+        # store cache
+        graph = (order, parents, children)
+        self._graph = (state, graph)
+
+        return graph
+
     def _init_frames(self, canvas, source, overrides):
         """Calculates and sets objects frames."""
 
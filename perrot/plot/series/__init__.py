@@ -2,13 +2,16 @@
 #  Copyright (c) Martin Strohalm. All rights reserved.
 
 # import main objects
+from . data import Column, Values, Records, DataSource
 from . series import Series
 from . scatter import Scatter, Asterisks, Circles, Crosses, Diamonds
 from . scatter import Pluses, Triangles, Squares
 from . bars import Rects, Bars, HBars, VBars
 from . lines import Lines
 from . profile import Profile
+from . rolling import Rolling
 from . band import Band
+from . heatmap import Heatmap
 
 # import helpers
 from . utils import *
@@ -6,7 +6,9 @@ import numpy
 from pero.properties import *
 from pero import Band as BandGlyph
 
+from .. enums import *
 from . series import Series
+from . data import DataProperty, Pyramid, Records
 from . import utils
 
 
@@ -32,6 +34,19 @@ class Band(Series):
     'data' property is not specified a sequence of internal raw data is created
     as ((x,y1,y2),) coordinates.
     
+    Missing values can be specified as NaN within the y-coordinates. In such
+    case the band is split into separate segments at each gap.
+    
+    The minimum and maximum of both y-coordinates within buckets of
+    power-of-two sizes are precomputed at extraction, so that the limits of
+    any x-range are calculated from a few buckets instead of scanning all the
+    visible data. For very large data the 'pyramid' property can be enabled
+    to keep also the indices of the extremes. The drawing then uses the
+    extreme points of the buckets matching current number of points per
+    device pixel only, so that the raw data are not scanned at coarse zoom.
+    The points are never reduced if the 'show_points' property is set to
+    True.
+    
     Properties:
         
         show_line: bool
@@ -45,20 +60,24 @@ class Band(Series):
         show_area: bool
             Specifies whether the area under profile line should be displayed.
         
-        data: tuple, list, numpy.ndarray or UNDEF
-            Specifies the sequence of the raw data points.
+        data: tuple, list, numpy.ndarray, dict, perrot.plot.DataSource or UNDEF
+            Specifies the sequence of the raw data points, a dict of data
+            columns or a shared data source.
         
-        x: int, float, tuple, list, numpy.ndarray, callable, None or UNDEF
+        x: int, float, tuple, list, numpy.ndarray, str, callable, None or UNDEF
             Specifies the sequence of x-coordinates in real data units or a
-            function to retrieve the coordinates from the raw data.
+            function to retrieve the coordinates from the raw data. If
+            specified as a path to .npy file, the data are memory-mapped.
         
-        y1: int, float, tuple, list, numpy.ndarray, callable, None or UNDEF
+        y1: int, float, tuple, list, numpy.ndarray, str, callable, None or UNDEF
             Specifies the sequence of high y-coordinates in real data units or a
-            function to retrieve the coordinates from the raw data.
+            function to retrieve the coordinates from the raw data. If
+            specified as a path to .npy file, the data are memory-mapped.
         
-        y2: int, float, tuple, list, numpy.ndarray, callable, None or UNDEF
+        y2: int, float, tuple, list, numpy.ndarray, str, callable, None or UNDEF
             Specifies the sequence of low y-coordinates in real data units or a
-            function to retrieve the coordinates from the raw data.
+            function to retrieve the coordinates from the raw data. If
+            specified as a path to .npy file, the data are memory-mapped.
         
         marker: pero.Marker, pero.MARKER, callable, None or UNDEF
             Specifies the marker glyph to draw actual data points with. The
@@ -69,6 +88,21 @@ class Band(Series):
             Specifies the minimum x-distance between points in device units to
             enable automatic points display.
         
+        storage: perrot.plot.STORAGE
+            Specifies the type used to store the coordinates as any item from
+            the perrot.plot.STORAGE enum. Compact types reduce memory, while
+            the coordinates are converted to 64-bit floats for visible range
+            only.
+        
+        autosort: bool
+            Specifies whether the data should be sorted automatically by
+            x-coordinates if not sorted already. If set to False, unsorted
+            data raise an error.
+        
+        pyramid: bool
+            Specifies whether the indices of the extremes should be kept to
+            speed up drawing of very large data.
+        
         line properties:
             Includes pero.LineProperties to specify the line.
         
@@ -80,13 +114,16 @@ class Band(Series):
     show_points = BoolProperty(UNDEF, dynamic=False)
     show_area = BoolProperty(True, dynamic=False)
     
-    data = SequenceProperty(UNDEF, dynamic=False)
+    data = DataProperty(UNDEF, dynamic=False)
     x = Property(UNDEF)
     y1 = Property(UNDEF)
     y2 = Property(UNDEF)
     
     marker = MarkerProperty('o', nullable=True)
     spacing = NumProperty(20, dynamic=False)
+    storage = EnumProperty(STORAGE_FLOAT64, enum=STORAGE, dynamic=False)
+    autosort = BoolProperty(False, dynamic=False)
+    pyramid = BoolProperty(False, dynamic=False)
     
     line = Include(LineProperties, line_color=UNDEF, dynamic=False)
     fill = Include(FillProperties, fill_color=UNDEF, dynamic=False)
@@ -105,6 +142,8 @@ class Band(Series):
         self._y1_data = []
         self._y2_data = []
         self._raw_data = []
+        self._buffers = None
+        self._pyramids = None
         self._limits = None
         
         # extract data
@@ -115,13 +154,14 @@ class Band(Series):
         self.lock_property('x')
         self.lock_property('y1')
         self.lock_property('y2')
+        self.lock_property('pyramid')
     
     
     def get_labels(self):
         """Gets series labels."""
         
-        labels = self.make_labels(self._x_data, self._y1_data, self._raw_data)
-        labels += self.make_labels(self._x_data, self._y2_data, self._raw_data)
+        labels = self.make_labels(self._x_data, self._y1_data, self._raw_data, x_sorted=True)
+        labels += self.make_labels(self._x_data, self._y2_data, self._raw_data, x_sorted=True)
         
         return labels
     
@@ -129,8 +169,8 @@ class Band(Series):
     def get_tooltip(self, x, y, limit):
         """Gets nearest data point tooltip."""
         
-        tooltip1 = self.make_tooltip(self._x_data, self._y1_data, self._raw_data, x, y, limit)
-        tooltip2 = self.make_tooltip(self._x_data, self._y2_data, self._raw_data, x, y, limit)
+        tooltip1 = self.make_tooltip(self._x_data, self._y1_data, self._raw_data, x, y, limit, x_sorted=True)
+        tooltip2 = self.make_tooltip(self._x_data, self._y2_data, self._raw_data, x, y, limit, x_sorted=True)
         
         if not tooltip1:
             return tooltip2
@@ -161,13 +201,15 @@ class Band(Series):
                 data = (self._x_data, self._y1_data),
                 crop = x_range,
                 extend = False,
-                interpolate = True)
+                interpolate = True,
+                pyramids = (None, self._pyramids[0]))
             
             limits_by_y2 = utils.calc_profile_limits(
                 data = (self._x_data, self._y2_data),
                 crop = x_range,
                 extend = False,
-                interpolate = True)
+                interpolate = True,
+                pyramids = (None, self._pyramids[1]))
             
             limits = utils.combine_limits(limits_by_y1, limits_by_y2)
         
@@ -183,32 +225,126 @@ class Band(Series):
         self._y1_data = []
         self._y2_data = []
         self._raw_data = []
+        self._buffers = None
+        self._pyramids = None
         self._limits = None
         
+        # update revision
+        self._revision += 1
+        
         # get data size
         size = utils.extract_data_size(self, 'data', 'x', 'y1', 'y2')
         
         # extract data
-        self._x_data, x_raw = utils.extract_data(self, 'x', self.data, size, self.x_mapper)
-        self._y1_data, y1_raw = utils.extract_data(self, 'y1', self.data, size, self.y_mapper)
-        self._y2_data, y2_raw = utils.extract_data(self, 'y2', self.data, size, self.y_mapper)
+        self._x_data, x_raw = utils.extract_data(self, 'x', self.data, size, self.x_mapper, storage=self.storage, mmap=True)
+        self._y1_data, y1_raw = utils.extract_data(self, 'y1', self.data, size, self.y_mapper, storage=self.storage, mmap=True)
+        self._y2_data, y2_raw = utils.extract_data(self, 'y2', self.data, size, self.y_mapper, storage=self.storage, mmap=True)
         
         # set raw data
         if self.data is not UNDEF:
-            self._raw_data = numpy.array(self.data)
+            self._raw_data = Records(self.data)
         else:
-            self._raw_data = numpy.array([x_raw, y1_raw, y2_raw]).T
+            self._raw_data = Records(columns=(x_raw, y1_raw, y2_raw))
         
         # check data
         if not utils.is_sorted(self._x_data):
-            raise ValueError("X-coordinates must be sorted!")
+            
+            if not self.autosort:
+                raise ValueError("X-coordinates must be sorted!")
+            
+            # sort data
+            order = numpy.argsort(self._x_data, kind='stable')
+            self._x_data = utils.store_data(self._x_data[order], self.storage)
+            self._y1_data = utils.store_data(self._y1_data[order], self.storage)
+            self._y2_data = utils.store_data(self._y2_data[order], self.storage)
+            self._raw_data = self._raw_data[order]
         
         # init full limits
         if len(self._raw_data) > 0:
+            
+            y_limits = utils.combine_limits(
+                utils.calc_limits(self._y1_data),
+                utils.calc_limits(self._y2_data))
+            
             self._limits = (
-                (self._x_data.min(), self._x_data.max()),
-                (min(self._y1_data.min(), self._y2_data.min()),
-                    max(self._y1_data.max(), self._y2_data.max())))
+                (self._x_data[0], self._x_data[-1]),
+                y_limits[0] if y_limits else None)
+        
+        # init pyramids
+        if len(self._raw_data) > 0:
+            self._pyramids = (
+                Pyramid(self._y1_data, indices=self.pyramid),
+                Pyramid(self._y2_data, indices=self.pyramid))
+    
+    
+    def append(self, data=UNDEF, x=UNDEF, y1=UNDEF, y2=UNDEF):
+        """
+        Appends new data points to the series. The points can be provided
+        either as raw data points, from which the coordinates are extracted by
+        current 'x', 'y1' and 'y2' selectors, or directly by the coordinates
+        values. Raw data must be provided if the series was created from raw
+        'data'.
+        
+        The data are stored in growable buffers so that the amortized cost of
+        appending, including the limits update, is proportional to the number
+        of new points only. The new points are expected to continue the
+        x-sorted sequence, which is verified for the new points only. If they
+        do not, the whole data are sorted if 'autosort' is enabled, otherwise
+        an error is raised. Note that the coordinates properties are not
+        updated by appended points. Values stored in quantized storage are
+        converted to 64-bit floats on first append.
+        
+        Args:
+            data: (any,), numpy.ndarray or UNDEF
+                Raw data points to append.
+            
+            x: float, (float,), numpy.ndarray or UNDEF
+                X-coordinates of the points to append.
+            
+            y1: float, (float,), numpy.ndarray or UNDEF
+                High y-coordinates of the points to append.
+            
+            y2: float, (float,), numpy.ndarray or UNDEF
+                Low y-coordinates of the points to append.
+        """
+        
+        # extract new points
+        final, raw = self._extract_appended(('x', 'y1', 'y2'), data, {'x': x, 'y1': y1, 'y2': y2})
+        if len(final['x']) == 0:
+            return
+        
+        # check order of new points
+        x_new = final['x']
+        ordered = utils.is_sorted(x_new) and (len(self._x_data) == 0 or x_new[0] >= self._x_data[-1])
+        
+        if not ordered and not self.autosort:
+            raise ValueError("X-coordinates must be sorted!")
+        
+        # store points
+        self._append_data(('x', 'y1', 'y2'), data, final, raw)
+        
+        # sort data
+        if not ordered:
+            self._sort_buffers(('x', 'y1', 'y2'), numpy.argsort(self._x_data, kind='stable'))
+        
+        # update pyramids
+        if self._pyramids is None or not ordered:
+            self._pyramids = (
+                Pyramid(self._y1_data, indices=self.pyramid),
+                Pyramid(self._y2_data, indices=self.pyramid))
+        else:
+            self._pyramids[0].extend(self._y1_data)
+            self._pyramids[1].extend(self._y2_data)
+        
+        # update full limits
+        y_limits = utils.combine_limits(
+            [self._limits[1]] if self._limits else None,
+            utils.calc_limits(final['y1']),
+            utils.calc_limits(final['y2']))
+        
+        self._limits = (
+            (self._x_data[0], self._x_data[-1]),
+            y_limits[0] if y_limits else None)
     
     
     def draw(self, canvas, source=UNDEF, **overrides):
@@ -225,17 +361,37 @@ class Band(Series):
         color = self.get_property('color', source, overrides)
         
         # set overrides to ignore
-        ignore = {'x', 'y1', 'y2', 'line_color', 'fill_color'}
+        ignore = {'data', 'x', 'y1', 'y2', 'line_color', 'fill_color'}
         
         # crop data
         i1, i2 = utils.crop_indices(self._x_data, x_scale.in_range, True)
         if i1 == i2:
             return
         
-        x_data = self._x_data[i1:i2]
-        y1_data = self._y1_data[i1:i2]
-        y2_data = self._y2_data[i1:i2]
-        raw_data = self._raw_data[i1:i2]
+        # select extreme points of dense data
+        indices = None
+        if self.pyramid and self._pyramids is not None and self.show_points is not True:
+            
+            width = abs(x_scale.out_range[1] - x_scale.out_range[0])
+            stride = 0.5 * (i2 - i1) / max(1, width)
+            
+            indices1 = self._pyramids[0].select(i1, i2, stride)
+            indices2 = self._pyramids[1].select(i1, i2, stride)
+            
+            if indices1 is not None:
+                indices = numpy.union1d(indices1, indices2)
+        
+        if indices is not None:
+            x_data = numpy.asarray(self._x_data[indices], dtype=numpy.float64)
+            y1_data = numpy.asarray(self._y1_data[indices], dtype=numpy.float64)
+            y2_data = numpy.asarray(self._y2_data[indices], dtype=numpy.float64)
+            raw_data = self._raw_data[indices]
+        
+        else:
+            x_data = numpy.asarray(self._x_data[i1:i2], dtype=numpy.float64)
+            y1_data = numpy.asarray(self._y1_data[i1:i2], dtype=numpy.float64)
+            y2_data = numpy.asarray(self._y2_data[i1:i2], dtype=numpy.float64)
+            raw_data = self._raw_data[i1:i2]
         
         # scale coords
         x_data = x_scale.scale(x_data)
@@ -259,11 +415,20 @@ class Band(Series):
             
             # set overrides
             glyph_overrides = overrides.copy()
-            glyph_overrides['x'] = x_data
-            glyph_overrides['y1'] = y1_data
-            glyph_overrides['y2'] = y2_data
             glyph_overrides['line_color'] = line_color
             glyph_overrides['fill_color'] = fill_color
             
-            # draw band
-            self._glyph.draw(canvas, raw_data, **glyph_overrides)
+            # draw segments between gaps
+            for s1, s2 in utils.split_gaps(y1_data, y2_data):
+                
+                # set segment overrides
+                glyph_overrides['x'] = x_data[s1:s2]
+                glyph_overrides['y1'] = y1_data[s1:s2]
+                glyph_overrides['y2'] = y2_data[s1:s2]
+                
+                # set visible records for points
+                if self.show_points is not False:
+                    glyph_overrides['data'] = numpy.asarray(raw_data[s1:s2])
+                
+                # draw band
+                self._glyph.draw(canvas, raw_data[s1:s2], **glyph_overrides)
@@ -2,13 +2,17 @@
 #  Copyright (c) Martin Strohalm. All rights reserved.
 
 import numpy
-from pero import Frame
+from pero import FillProperties, LineProperties
 from pero.enums import *
 from pero.properties import *
 
 from . import utils
+from .data import DataProperty, Records, Values
 from .series import Series
 
+# define constants
+_STYLE_PROPS = tuple(p.name for p in LineProperties.properties() + FillProperties.properties())
+
 
 class Rectangles(Series):
     """
@@ -23,10 +27,21 @@ class Rectangles(Series):
     'data' property is not specified a sequence of internal raw data is created
     as ((x,y),) coordinates according to the 'anchor' property.
     
+    The 'line_color', 'line_width' and 'fill_color' can also be specified as
+    numpy.ndarray or perrot.plot.Values of per-point values aligned with the
+    data points.
+    
+    For drawing, the rectangles are grouped by their resolved style so that the
+    pen and brush are set only once per group. If any visible rectangles
+    overlap, only consecutive rectangles of the same style are grouped to keep
+    their stacking order. Dynamic properties are evaluated only once and cached
+    until the data or the style properties are changed.
+    
     Properties:
         
-        data: tuple, list, numpy.ndarray or UNDEF
-            Specifies the sequence of the raw data points.
+        data: tuple, list, numpy.ndarray, dict, perrot.plot.DataSource or UNDEF
+            Specifies the sequence of the raw data points, a dict of data
+            columns or a shared data source.
         
         anchor: str
             Specifies the position within rectangles to be used to display
@@ -51,7 +66,7 @@ class Rectangles(Series):
             Includes pero.FillProperties to specify the fill.
     """
     
-    data = SequenceProperty(UNDEF, dynamic=False)
+    data = DataProperty(UNDEF, dynamic=False)
     anchor = EnumProperty(POS_CENTER, enum=POSITION_LRTBC, dynamic=False)
     
     x_offset = Property(UNDEF, dynamic=False)
@@ -67,6 +82,11 @@ class Rectangles(Series):
     def __init__(self, **overrides):
         """Initializes a new instance of Rectangles series base."""
         
+        # wrap per-point values
+        for name in ('line_color', 'line_width', 'fill_color'):
+            if isinstance(overrides.get(name), numpy.ndarray):
+                overrides[name] = Values(overrides[name])
+        
         super().__init__(**overrides)
         
         # init buffers
@@ -78,6 +98,8 @@ class Rectangles(Series):
         self._x_data = []
         self._y_data = []
         self._raw_data = []
+        self._styles = None
+        self._sorted = None
         self._limits = None
         
         # extract data
@@ -96,6 +118,9 @@ class Rectangles(Series):
         self.lock_property('right', raise_error=False)
         self.lock_property('top', raise_error=False)
         self.lock_property('bottom', raise_error=False)
+        
+        # bind events
+        self.bind(EVT_PROPERTY_CHANGED, self._on_rectangles_property_changed)
     
     
     def get_labels(self):
@@ -125,13 +150,15 @@ class Rectangles(Series):
             
             limits_top_left = utils.calc_points_limits(
                 data = (self._left_data, self._top_data),
-                crops = (x_range, y_range), 
-                extend = False)
+                crops = (x_range, y_range),
+                extend = False,
+                indices = self._get_sorted(('left', 'top')))
             
             limits_bottom_right = utils.calc_points_limits(
                 data = (self._right_data, self._bottom_data),
-                crops = (x_range, y_range), 
-                extend = False)
+                crops = (x_range, y_range),
+                extend = False,
+                indices = self._get_sorted(('right', 'bottom')))
             
             limits = utils.combine_limits(limits_top_left, limits_bottom_right)
         
@@ -151,8 +178,13 @@ class Rectangles(Series):
         self._x_data = []
         self._y_data = []
         self._raw_data = []
+        self._styles = None
+        self._sorted = None
         self._limits = None
         
+        # update revision
+        self._revision += 1
+        
         # get data size
         size = utils.extract_data_size(self, 'data', 'x', 'y', 'width', 'height', 'left', 'right', 'top', 'bottom')
         
@@ -195,26 +227,26 @@ class Rectangles(Series):
         # set anchor and raw data
         if self.anchor == POS_LEFT:
             self._x_data = self._left_data
-            self._raw_data = numpy.array([left_raw, y_raw]).T
+            self._raw_data = Records(columns=(left_raw, y_raw))
         
         elif self.anchor == POS_RIGHT:
             self._x_data = self._right_data
-            self._raw_data = numpy.array([right_raw, y_raw]).T
+            self._raw_data = Records(columns=(right_raw, y_raw))
         
         elif self.anchor == POS_TOP:
             self._y_data = self._top_data
-            self._raw_data = numpy.array([x_raw, top_raw]).T
+            self._raw_data = Records(columns=(x_raw, top_raw))
         
         elif self.anchor == POS_BOTTOM:
             self._y_data = self._bottom_data
-            self._raw_data = numpy.array([x_raw, bottom_raw]).T
+            self._raw_data = Records(columns=(x_raw, bottom_raw))
         
         else:
-            self._raw_data = numpy.array([x_raw, y_raw]).T
+            self._raw_data = Records(columns=(x_raw, y_raw))
         
         # set raw data
         if self.data is not UNDEF:
-            self._raw_data = numpy.array(self.data)
+            self._raw_data = Records(self.data)
         
         # apply offset
         if self.x_offset is not UNDEF:
@@ -266,7 +298,7 @@ class Rectangles(Series):
         top_data = self._top_data
         bottom_data = self._bottom_data
         raw_data = self._raw_data
-
+        
         width_limit = width_limit or 0
         height_limit = height_limit or 0
         
@@ -284,44 +316,72 @@ class Rectangles(Series):
         default_line_color = color.darker(0.2)
         default_fill_color = color
         
+        # get rectangles
+        x_data = numpy.minimum(left_data, right_data)
+        y_data = numpy.minimum(top_data, bottom_data)
+        width_data = numpy.maximum(numpy.abs(right_data - left_data), width_limit)
+        height_data = numpy.maximum(numpy.abs(bottom_data - top_data), height_limit)
+        
+        # get visible rectangles
+        indices = utils.cull_boxes(frame, left_data, top_data, right_data, bottom_data)
+        
+        # get styles
+        styles, groups = self._get_styles(overrides)
+        
+        # keep stacking order of overlapping rectangles
+        x_vis = x_data[indices]
+        y_vis = y_data[indices]
+        overlap = utils.boxes_overlap(x_vis, y_vis, x_vis + width_data[indices], y_vis + height_data[indices])
+        split = utils.split_runs if overlap else utils.split_groups
+        
         # start drawing group
         with canvas.group(tag, "series"):
             
-            # draw rectangles
-            for i, data in enumerate(raw_data):
-                
-                # get coords
-                x = left_data[i]
-                y = top_data[i]
-                width = right_data[i] - x
-                height = bottom_data[i] - y
-                
-                if width < 0:
-                    width *= -1
-                    x -= width
-                
-                if height < 0:
-                    height *= -1
-                    y -= height
-                
-                # apply clipping
-                bbox = Frame(x, y, width, height)
-                if not frame.overlaps(bbox):
-                    continue
+            # draw rectangles by style
+            for group, group_indices in split(indices, groups):
                 
                 # set pen and brush
-                canvas.set_pen_by(self, source=data, overrides=overrides)
-                canvas.set_brush_by(self, source=data, overrides=overrides)
+                style = styles[group]
+                canvas.set_properties(style)
                 
                 # set default colors
-                if self.get_property('line_color', overrides=overrides, native=True) is UNDEF:
+                if style['line_color'] is UNDEF:
                     canvas.line_color = default_line_color
                 
-                if self.get_property('fill_color', overrides=overrides, native=True) is UNDEF:
+                if style['fill_color'] is UNDEF:
                     canvas.fill_color = default_fill_color
                 
-                # draw rectangle
-                canvas.draw_rect(x, y, max(width_limit, width), max(height_limit, height))
+                # draw rectangles
+                for i in group_indices.tolist():
+                    canvas.draw_rect(x_data[i], y_data[i], width_data[i], height_data[i])
+    
+    
+    def _get_styles(self, overrides):
+        """Gets unique styles and style index of each rectangle."""
+        
+        # check overrides
+        cache = not any(name in overrides for name in _STYLE_PROPS)
+        
+        # use cached styles
+        if cache and self._styles is not None:
+            return self._styles
+        
+        # group by styles
+        styles = utils.group_styles(self, _STYLE_PROPS, self._raw_data, overrides)
+        
+        # store cache
+        if cache:
+            self._styles = styles
+        
+        return styles
+    
+    
+    def _on_rectangles_property_changed(self, evt):
+        """Called after any property has changed."""
+        
+        # reset styles
+        if evt.name in _STYLE_PROPS:
+            self._styles = None
 
 
 class Rects(Rectangles):
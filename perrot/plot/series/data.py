@@ -0,0 +1,1559 @@
+#  Created byMartin.cz
+#  Copyright (c) Martin Strohalm. All rights reserved.
+
+import numpy
+from collections.abc import Mapping
+
+from pero.properties import *
+
+
+class Column(object):
+    """
+    Column selector provides a fast way to retrieve series coordinates from the
+    raw 'data'. Instead of calling a function for every single data point, the
+    whole column is extracted at once by slicing, as long as the data are
+    provided as 2D numpy.ndarray (integer column index), structured
+    numpy.ndarray (field name), dict of sequences (key) or
+    perrot.plot.DataSource (column name).
+    
+    For any other type of data the selector still behaves like a standard
+    callable retrieving the item from each individual data point, so it can be
+    used anywhere a dynamic property is expected.
+    """
+    
+    
+    def __init__(self, key):
+        """
+        Initializes a new instance of Column.
+        
+        Args:
+            key: int or str
+                Column index, field name or key.
+        """
+        
+        self._key = key
+    
+    
+    def __call__(self, item):
+        """Gets column value from given data point."""
+        
+        return item[self._key]
+    
+    
+    def __str__(self):
+        """Gets standard string representation."""
+        
+        return "Column(%s)" % repr(self._key)
+    
+    
+    def __repr__(self):
+        """Gets debug string representation."""
+        
+        return self.__str__()
+    
+    
+    @property
+    def key(self):
+        """
+        Gets column index, field name or key.
+        
+        Returns:
+            int or str
+                Column index, field name or key.
+        """
+        
+        return self._key
+    
+    
+    def extract(self, data):
+        """
+        Extracts whole column from given data.
+        
+        Args:
+            data: (any,), numpy.ndarray, dict or perrot.plot.DataSource
+                Raw data from which to extract the column.
+        
+        Returns:
+            numpy.ndarray
+                Extracted column values.
+        """
+        
+        key = self._key
+        
+        # shared columns
+        if isinstance(data, DataSource):
+            return data.extract(key)[1]
+        
+        # dict of columns
+        if isinstance(data, Mapping):
+            return numpy.asarray(data[key])
+        
+        # numpy arrays
+        if isinstance(data, numpy.ndarray):
+            
+            # structured array
+            if data.dtype.names is not None and isinstance(key, str):
+                return data[key]
+            
+            # 2D array
+            if data.ndim == 2 and isinstance(key, (int, numpy.integer)):
+                return data[:, key]
+        
+        # general data points
+        return numpy.array([item[key] for item in data])
+
+
+class Values(object):
+    """
+    Values provide per-point property values (e.g. colors, sizes or widths)
+    given directly as a sequence aligned with the series data points. In
+    contrast to a function, the values are taken by the point index, so that
+    the styles of all points can be resolved at once without calling back for
+    every single data point. Colors can be given as names, hex codes or as
+    rows of RGB or RGBA values.
+    
+    Since the values are bound to the index, they cannot be retrieved from a
+    data point itself. If called as a dynamic property for any data point
+    (or UNDEF for legend), UNDEF is returned so that the property default is
+    used. The actual values must be taken by the point index.
+    """
+    
+    
+    def __init__(self, values):
+        """
+        Initializes a new instance of Values.
+        
+        Args:
+            values: (any,) or numpy.ndarray
+                Per-point values.
+        """
+        
+        self._values = numpy.asarray(values)
+        
+        # check values
+        if self._values.ndim == 0:
+            raise ValueError("Values must be a sequence!")
+    
+    
+    def __len__(self):
+        """Gets number of values."""
+        
+        return len(self._values)
+    
+    
+    def __getitem__(self, idx):
+        """Gets value at given index converted to native type."""
+        
+        value = self._values[idx]
+        
+        if isinstance(value, numpy.ndarray):
+            return tuple(value.tolist())
+        
+        if isinstance(value, numpy.generic):
+            return value.item()
+        
+        return value
+    
+    
+    def __call__(self, item):
+        """Gets value for given data point, which is always UNDEF."""
+        
+        return UNDEF
+    
+    
+    def __str__(self):
+        """Gets standard string representation."""
+        
+        return "Values(%d)" % len(self._values)
+    
+    
+    def __repr__(self):
+        """Gets debug string representation."""
+        
+        return self.__str__()
+    
+    
+    @property
+    def values(self):
+        """
+        Gets all values.
+        
+        Returns:
+            numpy.ndarray
+                Per-point values.
+        """
+        
+        return self._values
+
+
+class Records(object):
+    """
+    Records provide lazy access to the raw data points of a series. Instead of
+    creating the whole array of records in advance, individual records are
+    only created for the indices actually requested (e.g. by labels, tooltip
+    or dynamic properties).
+    
+    The records can be created either from the original raw 'data' (tuple,
+    list, numpy.ndarray, dict of columns or perrot.plot.DataSource) or from a
+    sequence of extracted raw 'columns'. In the first case the original items
+    are returned for sequences and dicts of values are returned for columnar
+    data. In the second case each record is created as a 1D numpy.ndarray of
+    corresponding column values.
+    
+    Slicing or indexing the records by an array of indices creates new
+    instance of Records still referring to the same data.
+    """
+    
+    
+    def __init__(self, data=None, columns=None, indices=None):
+        """
+        Initializes a new instance of Records.
+        
+        Args:
+            data: (any,), numpy.ndarray, dict, perrot.plot.DataSource or None
+                Original raw data.
+            
+            columns: (1D numpy.ndarray,) or None
+                Extracted raw data columns.
+            
+            indices: range, 1D numpy.ndarray or None
+                Indices of the records to be used.
+        """
+        
+        self._data = data
+        self._columns = columns
+        self._indices = indices
+        
+        # get full size
+        if columns is not None:
+            self._size = len(columns[0]) if columns else 0
+        
+        elif isinstance(data, Mapping):
+            self._size = len(next(iter(data.values()))) if data else 0
+        
+        elif data is not None:
+            self._size = len(data)
+        
+        else:
+            self._size = 0
+    
+    
+    def __len__(self):
+        """Gets number of records."""
+        
+        if self._indices is not None:
+            return len(self._indices)
+        
+        return self._size
+    
+    
+    def __iter__(self):
+        """Iterates over records."""
+        
+        for i in range(len(self)):
+            yield self[i]
+    
+    
+    def __getitem__(self, idx):
+        """Gets record at given index or records for given slice or indices."""
+        
+        # get single record
+        if isinstance(idx, (int, numpy.integer)):
+            
+            if self._indices is not None:
+                idx = self._indices[idx]
+            
+            elif idx < 0:
+                idx += self._size
+            
+            return self._make_record(idx)
+        
+        # get current indices
+        indices = self._indices
+        if indices is None:
+            indices = range(self._size)
+        
+        # apply slice
+        if isinstance(idx, slice):
+            indices = indices[idx]
+        
+        # apply indices
+        else:
+            
+            idx = numpy.asarray(idx)
+            if idx.dtype == numpy.bool_:
+                idx = numpy.flatnonzero(idx)
+            
+            if isinstance(indices, range):
+                indices = indices.start + idx * indices.step
+            else:
+                indices = indices[idx]
+        
+        return Records(self._data, self._columns, indices)
+    
+    
+    def __array__(self, dtype=None, copy=None):
+        """Creates array of all records."""
+        
+        # get indices
+        idx = self._indices
+        if idx is None:
+            idx = slice(None)
+        elif isinstance(idx, range):
+            idx = slice(idx.start, idx.stop, idx.step)
+        
+        # stack columns
+        if self._columns is not None:
+            records = numpy.array([c[idx] for c in self._columns]).T
+        
+        # make record array
+        elif isinstance(self._data, Mapping):
+            names = list(self._data.keys())
+            arrays = [numpy.asarray(self._data[k])[idx] for k in names]
+            records = numpy.rec.fromarrays(arrays, names=names)
+        
+        # use array directly
+        elif isinstance(self._data, numpy.ndarray):
+            records = self._data[idx]
+        
+        # convert sequence
+        elif self._data is not None:
+            records = numpy.array(self._data)[idx]
+        
+        else:
+            records = numpy.array([])
+        
+        # convert type
+        if dtype is not None:
+            records = records.astype(dtype, copy=False)
+        
+        return records
+    
+    
+    @property
+    def data(self):
+        """
+        Gets original raw data.
+        
+        Returns:
+            (any,), numpy.ndarray, dict, perrot.plot.DataSource or None
+                Original raw data.
+        """
+        
+        return self._data
+    
+    
+    @property
+    def columns(self):
+        """
+        Gets extracted raw data columns.
+        
+        Returns:
+            (1D numpy.ndarray,) or None
+                Extracted raw data columns.
+        """
+        
+        return self._columns
+    
+    
+    @property
+    def indices(self):
+        """
+        Gets indices of the records used.
+        
+        Returns:
+            range, 1D numpy.ndarray or None
+                Indices of the records.
+        """
+        
+        return self._indices
+    
+    
+    def _make_record(self, idx):
+        """Creates record for given absolute index."""
+        
+        # make record from columns
+        if self._columns is not None:
+            return numpy.array([c[idx] for c in self._columns])
+        
+        # make record from dict of columns
+        if isinstance(self._data, Mapping):
+            return {k: v[idx] for k, v in self._data.items()}
+        
+        # get original item
+        return self._data[idx]
+
+
+class QuantizedArray(object):
+    """
+    Quantized array provides compact storage of floating point values as
+    integer codes together with common 'scale' and 'offset', so that each
+    value is stored as value = code * scale + offset. The scale and offset are
+    determined automatically from the data range to use full range of the
+    specified integer type. The lowest code is reserved to store NaN values.
+    
+    Any indexing or slicing of the array provides decoded values as 64-bit
+    floats so that the conversion is only done for the data actually needed.
+    """
+    
+    
+    def __init__(self, data, dtype=numpy.int16):
+        """
+        Initializes a new instance of QuantizedArray.
+        
+        Args:
+            data: 1D numpy.ndarray
+                Values to store.
+            
+            dtype: numpy type
+                Integer type to be used for codes.
+        """
+        
+        data = numpy.asarray(data, dtype=numpy.float64)
+        info = numpy.iinfo(dtype)
+        
+        # get data range
+        mask = numpy.isnan(data)
+        self._has_nan = bool(mask.any())
+        
+        lo, hi = 0., 0.
+        if self._has_nan and not mask.all():
+            lo, hi = numpy.nanmin(data), numpy.nanmax(data)
+        elif not self._has_nan and len(data):
+            lo, hi = data.min(), data.max()
+        
+        # init scale
+        first = info.min + 1
+        self._scale = float(hi - lo) / (info.max - first) if hi > lo else 1.
+        self._offset = float(lo) - first * self._scale
+        self._nan = info.min
+        
+        # make codes
+        codes = numpy.rint((data - self._offset) / self._scale)
+        if self._has_nan:
+            codes[mask] = self._nan
+        
+        self._codes = codes.astype(dtype)
+    
+    
+    def __len__(self):
+        """Gets number of values."""
+        
+        return len(self._codes)
+    
+    
+    def __getitem__(self, idx):
+        """Gets decoded value or values at given index, slice or indices."""
+        
+        return self.decode(self._codes[idx])
+    
+    
+    def __array__(self, dtype=None, copy=None):
+        """Gets all decoded values."""
+        
+        data = self.decode(self._codes)
+        
+        if dtype is not None:
+            data = data.astype(dtype, copy=False)
+        
+        return data
+    
+    
+    @property
+    def dtype(self):
+        """
+        Gets type of decoded values.
+        
+        Returns:
+            numpy.dtype
+                Type of decoded values.
+        """
+        
+        return numpy.dtype(numpy.float64)
+    
+    
+    @property
+    def nbytes(self):
+        """
+        Gets number of bytes used by the codes.
+        
+        Returns:
+            int
+                Number of bytes.
+        """
+        
+        return self._codes.nbytes
+    
+    
+    @property
+    def codes(self):
+        """
+        Gets integer codes.
+        
+        Returns:
+            numpy.ndarray
+                Integer codes.
+        """
+        
+        return self._codes
+    
+    
+    @property
+    def scale(self):
+        """
+        Gets codes scale.
+        
+        Returns:
+            float
+                Codes scale.
+        """
+        
+        return self._scale
+    
+    
+    @property
+    def offset(self):
+        """
+        Gets codes offset.
+        
+        Returns:
+            float
+                Codes offset.
+        """
+        
+        return self._offset
+    
+    
+    def min(self):
+        """Gets minimum value."""
+        
+        if self._has_nan:
+            return numpy.nan
+        
+        return self.decode(self._codes.min())
+    
+    
+    def max(self):
+        """Gets maximum value."""
+        
+        if self._has_nan:
+            return numpy.nan
+        
+        return self.decode(self._codes.max())
+    
+    
+    def decode(self, codes):
+        """
+        Converts given codes into values.
+        
+        Args:
+            codes: int or numpy.ndarray
+                Codes to decode.
+        
+        Returns:
+            float or numpy.ndarray
+                Decoded values.
+        """
+        
+        values = codes * self._scale + self._offset
+        
+        if self._has_nan:
+            values = numpy.where(codes == self._nan, numpy.nan, values)
+        
+        return values
+
+
+class Buffer(object):
+    """
+    Buffer provides growable storage of 1D or 2D array data to allow fast
+    appending of new values. The underlying array is allocated with spare
+    capacity, which is doubled each time it runs out, so the amortized cost of
+    appending is proportional to the number of new values only. Current
+    values are available as a read-only view without copying.
+    """
+    
+    
+    def __init__(self, data, capacity=16):
+        """
+        Initializes a new instance of Buffer.
+        
+        Args:
+            data: numpy.ndarray or array-like
+                Initial values.
+            
+            capacity: int
+                Minimum initial capacity.
+        """
+        
+        data = numpy.asarray(data)
+        size = len(data)
+        
+        self._array = numpy.empty((max(size, capacity),) + data.shape[1:], dtype=data.dtype)
+        self._array[:size] = data
+        self._size = size
+    
+    
+    def __len__(self):
+        """Gets number of values."""
+        
+        return self._size
+    
+    
+    @property
+    def data(self):
+        """
+        Gets current values as read-only view.
+        
+        Returns:
+            numpy.ndarray
+                Current values.
+        """
+        
+        view = self._array[:self._size]
+        view.flags.writeable = False
+        
+        return view
+    
+    
+    @property
+    def dtype(self):
+        """
+        Gets type of stored values.
+        
+        Returns:
+            numpy.dtype
+                Type of stored values.
+        """
+        
+        return self._array.dtype
+    
+    
+    @property
+    def capacity(self):
+        """
+        Gets current capacity.
+        
+        Returns:
+            int
+                Number of values which can be stored without reallocation.
+        """
+        
+        return len(self._array)
+    
+    
+    def append(self, values):
+        """
+        Appends given values at the end of the buffer. If needed, the type of
+        stored values is promoted to hold new values.
+        
+        Args:
+            values: numpy.ndarray or array-like
+                Values to append.
+        """
+        
+        values = numpy.asarray(values)
+        size = self._size + len(values)
+        
+        # keep dtype able to hold new values
+        dtype = numpy.result_type(self._array.dtype, values.dtype)
+        
+        # grow array
+        if size > len(self._array) or dtype != self._array.dtype:
+            
+            capacity = max(len(self._array), 1)
+            while capacity < size:
+                capacity *= 2
+            
+            array = numpy.empty((capacity,) + self._array.shape[1:], dtype=dtype)
+            array[:self._size] = self._array[:self._size]
+            self._array = array
+        
+        # store values
+        self._array[self._size:size] = values
+        self._size = size
+    
+    
+    def replace(self, start, values):
+        """
+        Overwrites current values in place starting at given index.
+        
+        Args:
+            start: int
+                Index of the first value to overwrite.
+            
+            values: numpy.ndarray or array-like
+                New values.
+        """
+        
+        values = numpy.asarray(values)
+        end = start + len(values)
+        
+        # check range
+        if start < 0 or end > self._size:
+            raise IndexError("Values exceed current buffer size!")
+        
+        self._array[start:end] = values
+    
+    
+    def take(self, indices):
+        """
+        Reorders current values in place by given indices.
+        
+        Args:
+            indices: 1D numpy.ndarray
+                New order of current values.
+        """
+        
+        self._array[:self._size] = self._array[:self._size][indices]
+    
+    
+    def truncate(self, size):
+        """
+        Removes values beyond given size. The capacity is kept.
+        
+        Args:
+            size: int
+                Number of values to keep.
+        """
+        
+        self._size = max(0, min(size, self._size))
+
+
+class Pyramid(object):
+    """
+    Pyramid provides precomputed minimum and maximum of 1D data within
+    buckets of power-of-two sizes. Each level halves the number of buckets of
+    the previous one, so the whole pyramid takes about twice the memory of
+    its first level. It is used to get limits of any index range by scanning
+    a few buckets per level only and to select the extreme points of dense
+    data at given level of detail. Missing values (NaN) are ignored.
+    
+    The pyramid does not keep the data itself, so the same data must be
+    provided to the methods requiring them. Values appended at the end of
+    the data can be included by the 'extend' method and values overwritten
+    in place by the 'update' method, both without rebuilding. If
+    the points selection is not needed, the indices of the extremes can be
+    omitted to save memory and building time.
+    """
+    
+    
+    def __init__(self, data, stride=16, indices=True, chunk=1048576):
+        """
+        Initializes a new instance of Pyramid.
+        
+        Args:
+            data: 1D numpy.ndarray or perrot.plot.QuantizedArray
+                Data values.
+            
+            stride: int
+                Size of the smallest buckets. The value is rounded up to
+                nearest power of two.
+            
+            indices: bool
+                Specifies whether the indices of the extremes should be
+                stored to allow points selection.
+            
+            chunk: int
+                Maximum number of values processed at once.
+        """
+        
+        self._stride = 1 << max(1, int(stride - 1).bit_length())
+        self._chunk = max(1, chunk // self._stride) * self._stride
+        self._size = 0
+        
+        self._values = []
+        self._indices = [] if indices else None
+        
+        # build levels
+        self.extend(data)
+    
+    
+    def __len__(self):
+        """Gets number of covered values."""
+        
+        return self._size
+    
+    
+    @property
+    def strides(self):
+        """
+        Gets buckets size for each level.
+        
+        Returns:
+            (int,)
+                Buckets size for each level.
+        """
+        
+        return tuple(self._stride << i for i in range(len(self._values)))
+    
+    
+    def extend(self, data):
+        """
+        Updates the pyramid by values appended at the end of the data since
+        last update. Previous values are expected to be unchanged.
+        
+        Args:
+            data: 1D numpy.ndarray or perrot.plot.QuantizedArray
+                Data values.
+        """
+        
+        start = self._size
+        size = len(data)
+        
+        # check size
+        if size < start:
+            raise ValueError("Pyramid data cannot be shortened!")
+        
+        if size == start:
+            return
+        
+        # update first level from data
+        first = start // self._stride
+        values, indices = self._reduce_data(data, first * self._stride, size)
+        self._update_level(0, first, values, indices)
+        
+        # update next levels from previous
+        level = 1
+        while len(self._values[level-1]) > 1:
+            
+            first = start // (self._stride << level)
+            if level == len(self._values):
+                first = 0
+            
+            values = self._values[level-1].data[2*first:]
+            indices = None
+            
+            if self._indices is not None:
+                indices = self._indices[level-1].data[2*first:]
+            
+            values, indices = self._reduce_level(values, indices)
+            self._update_level(level, first, values, indices)
+            
+            level += 1
+        
+        self._size = size
+    
+    
+    def update(self, data, start, end):
+        """
+        Updates the pyramid by values changed within given index range since
+        last update. The data size is expected to be unchanged.
+        
+        Args:
+            data: 1D numpy.ndarray or perrot.plot.QuantizedArray
+                Data values.
+            
+            start: int
+                Index of the first changed value.
+            
+            end: int
+                Index after the last changed value.
+        """
+        
+        start = max(0, start)
+        end = min(end, self._size)
+        
+        if start >= end:
+            return
+        
+        # update first level from data
+        first = start // self._stride
+        last = -(-end // self._stride)
+        
+        values, indices = self._reduce_data(data, first * self._stride, min(last * self._stride, self._size))
+        self._replace_level(0, first, values, indices)
+        
+        # update next levels from previous
+        for level in range(1, len(self._values)):
+            
+            first = first // 2
+            last = -(-last // 2)
+            
+            values = self._values[level-1].data[2*first:2*last]
+            indices = None
+            
+            if self._indices is not None:
+                indices = self._indices[level-1].data[2*first:2*last]
+            
+            values, indices = self._reduce_level(values, indices)
+            self._replace_level(level, first, values, indices)
+    
+    
+    def get_limits(self, data, start, end):
+        """
+        Gets minimum and maximum of the values within given index range.
+        
+        Args:
+            data: 1D numpy.ndarray or perrot.plot.QuantizedArray
+                Data values.
+            
+            start: int
+                Index of the first value.
+            
+            end: int
+                Index after the last value.
+        
+        Returns:
+            (float, float) or None
+                Minimum and maximum or None if no valid values.
+        """
+        
+        lo = numpy.inf
+        hi = -numpy.inf
+        
+        spans = [(max(0, start), min(end, self._size))]
+        
+        # use full buckets from coarse to fine
+        for level in reversed(range(len(self._values))):
+            
+            stride = self._stride << level
+            values = self._values[level].data
+            remains = []
+            
+            for i1, i2 in spans:
+                
+                b1 = -(-i1 // stride)
+                b2 = i2 // stride
+                
+                if b1 >= b2:
+                    remains.append((i1, i2))
+                    continue
+                
+                lo = min(lo, values[b1:b2, 0].min())
+                hi = max(hi, values[b1:b2, 1].max())
+                
+                if i1 < b1 * stride:
+                    remains.append((i1, b1 * stride))
+                
+                if b2 * stride < i2:
+                    remains.append((b2 * stride, i2))
+            
+            spans = remains
+        
+        # scan remaining values
+        for i1, i2 in spans:
+            
+            if i1 >= i2:
+                continue
+            
+            part = numpy.asarray(data[i1:i2], dtype=numpy.float64)
+            lo = min(lo, numpy.fmin.reduce(part, initial=numpy.inf))
+            hi = max(hi, numpy.fmax.reduce(part, initial=-numpy.inf))
+        
+        # check values
+        if lo > hi:
+            return None
+        
+        return float(lo), float(hi)
+    
+    
+    def select(self, start, end, stride):
+        """
+        Gets indices of the minimum and maximum within each bucket of the
+        coarsest level with buckets not bigger than given size. The first and
+        last index of the range are always included.
+        
+        Args:
+            start: int
+                Index of the first value.
+            
+            end: int
+                Index after the last value.
+            
+            stride: int or float
+                Maximum size of the buckets.
+        
+        Returns:
+            1D numpy.ndarray or None
+                Sorted indices of the selected values or None if the smallest
+                buckets are bigger than given size.
+        """
+        
+        # check indices
+        if self._indices is None:
+            raise ValueError("Pyramid was built without indices!")
+        
+        # get level
+        level = int(numpy.floor(numpy.log2(max(stride, 1) / self._stride)))
+        level = min(level, len(self._values) - 1)
+        
+        if level < 0 or start >= end:
+            return None
+        
+        # get buckets
+        stride = self._stride << level
+        b1 = start // stride
+        b2 = -(-end // stride)
+        
+        # get indices ordered within buckets
+        indices = numpy.sort(self._indices[level].data[b1:b2], axis=1).ravel()
+        indices = indices[(indices >= start) & (indices < end)]
+        
+        return numpy.unique(numpy.concatenate(([start], indices, [end - 1])))
+    
+    
+    def _update_level(self, level, first, values, indices):
+        """Replaces buckets of given level starting at specified bucket."""
+        
+        # init level
+        if level == len(self._values):
+            self._values.append(Buffer(values))
+            if self._indices is not None:
+                self._indices.append(Buffer(indices))
+            return
+        
+        # replace buckets
+        self._values[level].truncate(first)
+        self._values[level].append(values)
+        
+        if self._indices is not None:
+            self._indices[level].truncate(first)
+            self._indices[level].append(indices)
+    
+    
+    def _replace_level(self, level, first, values, indices):
+        """Overwrites buckets of given level starting at specified bucket."""
+        
+        self._values[level].replace(first, values)
+        
+        if self._indices is not None:
+            self._indices[level].replace(first, indices)
+    
+    
+    def _reduce_data(self, data, start, end):
+        """Calculates buckets of the first level from data."""
+        
+        stride = self._stride
+        count = -(-(end - start) // stride)
+        
+        values = numpy.empty((count, 2), dtype=numpy.float64)
+        indices = None
+        
+        if self._indices is not None:
+            indices = numpy.empty((count, 2), dtype=numpy.intp)
+        
+        # process chunks
+        for i in range(start, end, self._chunk):
+            
+            part = numpy.asarray(data[i:min(i + self._chunk, end)], dtype=numpy.float64)
+            pad = -len(part) % stride
+            
+            b = (i - start) // stride
+            n = -(-len(part) // stride)
+            
+            # get extremes only
+            if indices is None:
+                
+                starts = numpy.arange(0, len(part), stride)
+                lows = numpy.fmin.reduceat(part, starts)
+                highs = numpy.fmax.reduceat(part, starts)
+                
+                values[b:b+n, 0] = numpy.where(lows == lows, lows, numpy.inf)
+                values[b:b+n, 1] = numpy.where(highs == highs, highs, -numpy.inf)
+                continue
+            
+            # ignore missing values
+            missing = numpy.isnan(part)
+            lows = numpy.append(numpy.where(missing, numpy.inf, part), numpy.full(pad, numpy.inf))
+            highs = numpy.append(numpy.where(missing, -numpy.inf, part), numpy.full(pad, -numpy.inf))
+            
+            lows = lows.reshape(-1, stride)
+            highs = highs.reshape(-1, stride)
+            
+            # get extremes and their indices
+            rows = numpy.arange(n)
+            mins = lows.argmin(axis=1)
+            maxs = highs.argmax(axis=1)
+            
+            values[b:b+n, 0] = lows[rows, mins]
+            values[b:b+n, 1] = highs[rows, maxs]
+            
+            indices[b:b+n, 0] = i + rows * stride + mins
+            indices[b:b+n, 1] = i + rows * stride + maxs
+        
+        return values, indices
+    
+    
+    def _reduce_level(self, values, indices):
+        """Calculates buckets of next level from previous level buckets."""
+        
+        # make pairs
+        if len(values) % 2:
+            values = numpy.append(values, [[numpy.inf, -numpy.inf]], axis=0)
+            if indices is not None:
+                indices = numpy.append(indices, indices[-1:], axis=0)
+        
+        lows = values[:, 0].reshape(-1, 2)
+        highs = values[:, 1].reshape(-1, 2)
+        
+        # get extremes only
+        if indices is None:
+            return numpy.column_stack((lows.min(axis=1), highs.max(axis=1))), None
+        
+        # get extremes and their indices
+        rows = numpy.arange(len(lows))
+        mins = (lows[:, 1] < lows[:, 0]).astype(numpy.intp)
+        maxs = (highs[:, 1] > highs[:, 0]).astype(numpy.intp)
+        
+        values = numpy.column_stack((lows[rows, mins], highs[rows, maxs]))
+        indices = numpy.column_stack((
+            indices[:, 0].reshape(-1, 2)[rows, mins],
+            indices[:, 1].reshape(-1, 2)[rows, maxs]))
+        
+        return values, indices
+
+
+class SortedIndex(object):
+    """
+    Sorted index provides the permutation sorting 1D data ascendantly together
+    with the sorted values, so that the data can be repeatedly cropped by a
+    range of values using binary search instead of sorting. The data are
+    sorted on first use only. Missing values (NaN) are placed at the end.
+    """
+    
+    
+    def __init__(self, data):
+        """
+        Initializes a new instance of SortedIndex.
+        
+        Args:
+            data: 1D numpy.ndarray
+                Data values.
+        """
+        
+        self._data = data
+        self._indices = None
+        self._values = None
+    
+    
+    def __len__(self):
+        """Gets number of indexed values."""
+        
+        return len(self._data)
+    
+    
+    @property
+    def indices(self):
+        """
+        Gets indices sorting the data.
+        
+        Returns:
+            1D numpy.ndarray
+                Sorting indices.
+        """
+        
+        if self._indices is None:
+            self._sort()
+        
+        return self._indices
+    
+    
+    @property
+    def values(self):
+        """
+        Gets sorted data values.
+        
+        Returns:
+            1D numpy.ndarray
+                Sorted values.
+        """
+        
+        if self._values is None:
+            self._sort()
+        
+        return self._values
+    
+    
+    def extend(self, data):
+        """
+        Updates the index by values appended at the end of the data since
+        last update. The new values are merged into current sorted values
+        without sorting all the data again.
+        
+        Args:
+            data: 1D numpy.ndarray
+                Data values.
+        """
+        
+        start = len(self._data)
+        self._data = data
+        
+        # check sorting
+        if self._indices is None:
+            return
+        
+        # sort new values
+        values = numpy.asarray(data[start:])
+        order = numpy.argsort(values, kind='stable')
+        values = values[order]
+        
+        # merge into current
+        positions = numpy.searchsorted(self._values, values, side='right')
+        
+        self._values = numpy.insert(self._values, positions, values)
+        self._indices = numpy.insert(self._indices, positions, order + start)
+    
+    
+    def _sort(self):
+        """Sorts the data."""
+        
+        data = numpy.asarray(self._data)
+        
+        self._indices = numpy.argsort(data, kind='stable')
+        self._values = data[self._indices]
+
+
+class GridIndex(object):
+    """
+    Grid index divides the bounding box of 2D points into a regular grid of
+    cells and keeps the indices of the points ordered by cells together with
+    the bounding box of the points within each cell. This allows to get
+    limits of the points within any rectangle by combining the boxes of the
+    cells lying fully inside and checking the points of the boundary cells
+    only, so the costs depend on the number of cells rather than on the
+    number of points. Points with missing values (NaN) are ignored.
+    """
+    
+    
+    def __init__(self, x_data, y_data, density=64, size=1024):
+        """
+        Initializes a new instance of GridIndex.
+        
+        Args:
+            x_data: 1D numpy.ndarray
+                X-coordinates of the points.
+            
+            y_data: 1D numpy.ndarray
+                Y-coordinates of the points.
+            
+            density: int
+                Average number of points per cell.
+            
+            size: int
+                Maximum number of cells along each axis.
+        """
+        
+        x_data = numpy.asarray(x_data, dtype=numpy.float64)
+        y_data = numpy.asarray(y_data, dtype=numpy.float64)
+        
+        self._x_data = x_data
+        self._y_data = y_data
+        
+        # remove missing
+        valid = ~(numpy.isnan(x_data) | numpy.isnan(y_data))
+        indices = numpy.flatnonzero(valid)
+        
+        x_data = x_data[indices]
+        y_data = y_data[indices]
+        
+        # init grid
+        count = max(1, min(size, int(numpy.sqrt(len(indices) / max(1, density)))))
+        self._shape = (count, count)
+        self._box = None
+        
+        if len(indices) == 0:
+            self._indices = indices
+            self._starts = numpy.zeros(count * count + 1, dtype=numpy.intp)
+            return
+        
+        x_lo, x_hi = x_data.min(), x_data.max()
+        y_lo, y_hi = y_data.min(), y_data.max()
+        
+        self._box = (x_lo, x_hi, y_lo, y_hi)
+        
+        # get cells
+        cols = self._get_cells(x_data, x_lo, x_hi, count)
+        rows = self._get_cells(y_data, y_lo, y_hi, count)
+        cells = rows * count + cols
+        
+        # order points by cells
+        order = numpy.argsort(cells, kind='stable')
+        
+        self._indices = indices[order]
+        self._starts = numpy.zeros(count * count + 1, dtype=numpy.intp)
+        self._starts[1:] = numpy.cumsum(numpy.bincount(cells, minlength=count * count))
+        
+        # get cells boxes
+        x_data = x_data[order]
+        y_data = y_data[order]
+        
+        filled = numpy.flatnonzero(self._starts[1:] > self._starts[:-1])
+        starts = self._starts[filled]
+        
+        self._boxes = numpy.empty((count * count, 4), dtype=numpy.float64)
+        self._boxes[:] = (numpy.inf, -numpy.inf, numpy.inf, -numpy.inf)
+        
+        self._boxes[filled, 0] = numpy.minimum.reduceat(x_data, starts)
+        self._boxes[filled, 1] = numpy.maximum.reduceat(x_data, starts)
+        self._boxes[filled, 2] = numpy.minimum.reduceat(y_data, starts)
+        self._boxes[filled, 3] = numpy.maximum.reduceat(y_data, starts)
+    
+    
+    def __len__(self):
+        """Gets number of indexed points."""
+        
+        return len(self._indices)
+    
+    
+    @property
+    def shape(self):
+        """
+        Gets number of cells along each axis.
+        
+        Returns:
+            (int, int)
+                Number of rows and columns.
+        """
+        
+        return self._shape
+    
+    
+    def get_limits(self, x_range, y_range):
+        """
+        Gets limits of the points within given rectangle including its edges.
+        
+        Args:
+            x_range: (float, float)
+                Range of the rectangle along x-axis.
+            
+            y_range: (float, float)
+                Range of the rectangle along y-axis.
+        
+        Returns:
+            [[float, float],]
+                Limits of the points as [min, max] or None for each axis.
+        """
+        
+        # check data
+        if self._box is None:
+            return [None, None]
+        
+        x1, x2 = min(x_range), max(x_range)
+        y1, y2 = min(y_range), max(y_range)
+        
+        # get candidate cells
+        x_lo, x_hi, y_lo, y_hi = self._box
+        rows, cols = self._shape
+        
+        c1, c2 = self._get_cells(numpy.array([x1, x2]), x_lo, x_hi, cols)
+        r1, r2 = self._get_cells(numpy.array([y1, y2]), y_lo, y_hi, rows)
+        
+        cells = numpy.arange(max(0, r1 - 1), min(rows, r2 + 2))[:, None] * cols
+        cells = (cells + numpy.arange(max(0, c1 - 1), min(cols, c2 + 2))).ravel()
+        
+        # get overlapping cells
+        boxes = self._boxes[cells]
+        
+        overlap = (boxes[:, 0] <= x2) & (boxes[:, 1] >= x1) & (boxes[:, 2] <= y2) & (boxes[:, 3] >= y1)
+        inside = overlap & (boxes[:, 0] >= x1) & (boxes[:, 1] <= x2) & (boxes[:, 2] >= y1) & (boxes[:, 3] <= y2)
+        
+        # use boxes of inner cells
+        inner = boxes[inside]
+        lo = [inner[:, 0].min(initial=numpy.inf), inner[:, 2].min(initial=numpy.inf)]
+        hi = [inner[:, 1].max(initial=-numpy.inf), inner[:, 3].max(initial=-numpy.inf)]
+        
+        # check points of boundary cells
+        cells = cells[overlap & ~inside]
+        
+        starts = self._starts[cells]
+        counts = self._starts[cells + 1] - starts
+        
+        positions = numpy.repeat(starts - numpy.cumsum(counts) + counts, counts)
+        indices = self._indices[positions + numpy.arange(len(positions))]
+        
+        x_data = self._x_data[indices]
+        y_data = self._y_data[indices]
+        
+        mask = (x_data >= x1) & (x_data <= x2) & (y_data >= y1) & (y_data <= y2)
+        x_data = x_data[mask]
+        y_data = y_data[mask]
+        
+        lo = [min(lo[0], x_data.min(initial=numpy.inf)), min(lo[1], y_data.min(initial=numpy.inf))]
+        hi = [max(hi[0], x_data.max(initial=-numpy.inf)), max(hi[1], y_data.max(initial=-numpy.inf))]
+        
+        # check points
+        if lo[0] > hi[0]:
+            return [None, None]
+        
+        return [[lo[0], hi[0]], [lo[1], hi[1]]]
+    
+    
+    def _get_cells(self, data, lo, hi, count):
+        """Gets cells for given coordinates."""
+        
+        if hi <= lo:
+            return numpy.zeros(len(data), dtype=numpy.intp)
+        
+        cells = numpy.floor((data - lo) * (count / (hi - lo)))
+        return numpy.clip(cells, 0, count - 1).astype(numpy.intp)
+
+
+class DataSource(Mapping):
+    """
+    Data source provides a columnar container of data, which can be shared by
+    multiple series. Each series can reference the columns by name, either by
+    using the perrot.plot.Column selector or directly by the column name
+    (e.g. x='time'), while the data source is set as the series 'data'.
+    
+    Extracted columns are cached per column name, mapper and data type so that
+    the same column used by many series (typically the x-coordinates) is
+    converted and mapped only once. The cache of a column is cleared whenever
+    the column is set again. Note that the cache relies on the mapper identity,
+    therefore it must be cleared manually by the 'clear_cache' method if a
+    mapper is modified in place.
+    """
+    
+    
+    def __init__(self, data=None, **columns):
+        """
+        Initializes a new instance of DataSource.
+        
+        Args:
+            data: dict or None
+                Data columns as {name: values}.
+            
+            columns: key-value pairs
+                Data columns specified as keyword arguments.
+        """
+        
+        self._columns = {}
+        self._cache = {}
+        self._size = 0
+        
+        # set columns
+        if data is not None:
+            columns = dict(data, **columns)
+        
+        for name, values in columns.items():
+            self[name] = values
+    
+    
+    def __getitem__(self, name):
+        """Gets column values."""
+        
+        return self._columns[name]
+    
+    
+    def __setitem__(self, name, values):
+        """Sets column values."""
+        
+        # make read-only array
+        values = numpy.asarray(values).view()
+        values.flags.writeable = False
+        
+        # check size
+        others = [n for n in self._columns if n != name]
+        if others and len(values) != self._size:
+            message = "Inconsistent data length for '%s' column!" % name
+            raise ValueError(message)
+        
+        # set column
+        self._columns[name] = values
+        self._size = len(values)
+        
+        # clear cache
+        self.clear_cache(name)
+    
+    
+    def __iter__(self):
+        """Iterates over column names."""
+        
+        return iter(self._columns)
+    
+    
+    def __len__(self):
+        """Gets number of columns."""
+        
+        return len(self._columns)
+    
+    
+    @property
+    def size(self):
+        """
+        Gets number of rows.
+        
+        Returns:
+            int
+                Number of rows.
+        """
+        
+        return self._size
+    
+    
+    def extract(self, name, mapper=None, dtype=numpy.float64):
+        """
+        Extracts specified column mapped by given mapper and cast to specified
+        type. If no mapper is specified, raw values are cast only. The results
+        are cached so that subsequent calls with the same arguments return the
+        same read-only arrays.
+        
+        Args:
+            name: str
+                Column name.
+            
+            mapper: pero.Scale or None
+                Scale to map raw values into final coordinates.
+            
+            dtype: numpy type
+                Final data type for values.
+        
+        Returns:
+            (numpy.ndarray, numpy.ndarray)
+                Two 1D arrays of final values and raw data.
+        """
+        
+        raw = self._columns[name]
+        
+        # check cache
+        key = (name, id(mapper) if mapper else None, numpy.dtype(dtype))
+        cached = self._cache.get(key, None)
+        if cached is not None and cached[0] is mapper:
+            return cached[1], raw
+        
+        # apply mapper
+        data = numpy.asarray(mapper.scale(raw)) if mapper else raw
+        
+        # ensure type
+        if data.dtype != dtype:
+            data = data.astype(dtype, copy=False)
+        
+        # make read-only
+        if data is not raw:
+            data.flags.writeable = False
+        
+        # store cache
+        self._cache[key] = (mapper, data)
+        
+        return data, raw
+    
+    
+    def clear_cache(self, name=None):
+        """
+        Removes cached extraction results for specified column or all the
+        columns.
+        
+        Args:
+            name: str or None
+                Column name or None to clear whole cache.
+        """
+        
+        if name is None:
+            self._cache = {}
+        else:
+            self._cache = {k: v for k, v in self._cache.items() if k[0] != name}
+
+
+class DataProperty(Property):
+    """
+    Defines a raw series data property allowing list, tuple, numpy.ndarray,
+    dict of columns or perrot.plot.DataSource.
+    """
+    
+    
+    def __init__(self, default=UNDEF, **kwargs):
+        """Initializes a new instance of DataProperty."""
+        
+        kwargs['default'] = default
+        kwargs['types'] = (list, tuple, numpy.ndarray, dict, DataSource)
+        
+        super().__init__(**kwargs)
@@ -0,0 +1,395 @@
+#  Created byMartin.cz
+#  Copyright (c) Martin Strohalm. All rights reserved.
+
+import numpy
+
+from pero.enums import *
+from pero.properties import *
+from pero import LinScale
+
+from .. colorbar import ColorBar
+from . series import Series
+from . import utils
+
+
+class Heatmap(Series):
+    """
+    This type of series plots a 2D array of values as a regular grid of colored
+    cells. Columns of the 'data' are placed along the x-axis and rows along the
+    y-axis, evenly spanning the ranges specified by the 'x_extent' and
+    'y_extent' properties in real data units, with the first row drawn at the
+    start of the y-extent. If the extents are not specified, the column and
+    row indices are used.
+    
+    The values are converted into colors at once using the lookup table of the
+    'color_bar', which is typically added to the plot and mapped to an axis.
+    If not specified, an internal color bar is used, scaled to the full range
+    of the values.
+    
+    For drawing, only the cells within current view are used and they are
+    resampled by averaging to the device resolution specified by the
+    'resolution' property. The drawing costs therefore depend on the plot size
+    rather than on the data size. Adjacent cells of the same color are merged
+    and drawn as a single rectangle. Missing values (NaN) are not drawn.
+    
+    Properties:
+        
+        data: numpy.ndarray, ((float,),)
+            Specifies the 2D array of values.
+        
+        x_extent: (float, float) or UNDEF
+            Specifies the x-range covered by the columns in real data units.
+        
+        y_extent: (float, float) or UNDEF
+            Specifies the y-range covered by the rows in real data units.
+        
+        color_bar: perrot.plot.ColorBar or UNDEF
+            Specifies the color bar to convert values into colors.
+        
+        resolution: int or float
+            Specifies the minimum size of the resampled cells in device units.
+    """
+    
+    data = Property(UNDEF, types=(numpy.ndarray, list, tuple), dynamic=False)
+    x_extent = TupleProperty(UNDEF, intypes=(int, float), dynamic=False)
+    y_extent = TupleProperty(UNDEF, intypes=(int, float), dynamic=False)
+    
+    color_bar = Property(UNDEF, types=(ColorBar,), dynamic=False, nullable=True)
+    resolution = NumProperty(4, dynamic=False)
+    margin = QuadProperty(0, dynamic=False)
+    
+    
+    def __init__(self, **overrides):
+        """Initializes a new instance of Heatmap series."""
+        
+        super().__init__(**overrides)
+        
+        # init buffers
+        self._values = None
+        self._has_nan = False
+        self._color_bar = None
+        self._limits = None
+        
+        # extract data
+        self.extract_data()
+        
+        # lock properties
+        self.lock_property('data')
+        self.lock_property('x_extent')
+        self.lock_property('y_extent')
+    
+    
+    def get_labels(self):
+        """Gets series labels."""
+        
+        return []
+    
+    
+    def get_tooltip(self, x, y, limit):
+        """Gets tooltip of the cell under cursor."""
+        
+        # check tooltip
+        if not self.show_tooltip or not self.tooltip or self._limits is None:
+            return None
+        
+        # get cell
+        (x1, x2), (y1, y2) = self._limits
+        rows, cols = self._values.shape
+        
+        col = int(numpy.floor((self.x_scale.invert(x) - x1) / (x2 - x1) * cols))
+        row = int(numpy.floor((self.y_scale.invert(y) - y1) / (y2 - y1) * rows))
+        
+        if col < 0 or col >= cols or row < 0 or row >= rows:
+            return None
+        
+        # check value
+        value = self._values[row, col]
+        if value != value:
+            return None
+        
+        # make record
+        record = numpy.array([
+            x1 + (col + 0.5) * (x2 - x1) / cols,
+            y1 + (row + 0.5) * (y2 - y1) / rows,
+            value])
+        
+        # get overrides
+        overrides = {
+            'x': x,
+            'y': y,
+            'z_index': 0}
+        
+        # make tooltip
+        return self.tooltip.clone(record, overrides)
+    
+    
+    def get_limits(self, x_range=None, y_range=None, exact=False):
+        """Gets current data limits using whole range or specified crops."""
+        
+        # check data
+        if self._limits is None:
+            return None
+        
+        # init limits
+        limits = self._limits
+        
+        # apply crop
+        if x_range or y_range:
+            
+            x_limits = self._crop_extent(limits[0], x_range)
+            y_limits = self._crop_extent(limits[1], y_range)
+            
+            limits = [x_limits, y_limits]
+            if x_limits is None or y_limits is None:
+                limits = [None, None]
+        
+        # finalize limits
+        return self.finalize_limits(limits, exact)
+    
+    
+    def extract_data(self):
+        """Extracts values from raw data."""
+        
+        # reset buffers
+        self._values = None
+        self._has_nan = False
+        self._limits = None
+        
+        # update revision
+        self._revision += 1
+        
+        # check data
+        if self.data is UNDEF:
+            return
+        
+        # get values
+        values = numpy.asarray(self.data)
+        
+        if values.ndim != 2:
+            message = "Heatmap data must be 2D array! -> %s" % (values.shape,)
+            raise ValueError(message)
+        
+        if not numpy.issubdtype(values.dtype, numpy.floating):
+            values = values.astype(numpy.float64)
+        
+        if values.size == 0:
+            return
+        
+        self._values = values
+        self._has_nan = bool(numpy.isnan(values).any())
+        
+        # init full limits
+        rows, cols = values.shape
+        
+        x_extent = self.x_extent if self.x_extent is not UNDEF else (0, cols)
+        y_extent = self.y_extent if self.y_extent is not UNDEF else (0, rows)
+        
+        self._limits = (
+            (float(x_extent[0]), float(x_extent[1])),
+            (float(y_extent[0]), float(y_extent[1])))
+        
+        # init internal color bar
+        if self._has_nan and numpy.isnan(values).all():
+            z_range = (0., 1.)
+        else:
+            z_range = (float(numpy.nanmin(values)), float(numpy.nanmax(values)))
+        
+        # widen zero-width range
+        if z_range[0] == z_range[1]:
+            z_range = (z_range[0] - 0.5, z_range[1] + 0.5)
+        
+        if self._color_bar is None:
+            self._color_bar = ColorBar(scale=LinScale(in_range=z_range))
+        else:
+            self._color_bar.scale.in_range = z_range
+    
+    
+    def set_data(self, data, x_extent=UNDEF, y_extent=UNDEF):
+        """
+        Replaces current values and extents by new ones. The internal color
+        bar is kept and only rescaled to the new values, so that its lookup
+        table is not created again.
+        
+        Args:
+            data: numpy.ndarray, ((float,),)
+                New 2D array of values.
+            
+            x_extent: (float, float) or UNDEF
+                X-range covered by the columns in real data units.
+            
+            y_extent: (float, float) or UNDEF
+                Y-range covered by the rows in real data units.
+        """
+        
+        # set properties
+        for name, value in (('data', data), ('x_extent', x_extent), ('y_extent', y_extent)):
+            self.lock_property(name, False)
+            self.set_property(name, value)
+            self.lock_property(name)
+        
+        # extract data
+        self.extract_data()
+    
+    
+    def draw(self, canvas, source=UNDEF, **overrides):
+        """Uses given canvas to draw the series."""
+        
+        # check if visible
+        if not self.is_visible(source, overrides):
+            return
+        
+        # check data
+        if self._values is None:
+            return
+        
+        # get properties
+        tag = self.get_property('tag', source, overrides)
+        x_scale = self.get_property('x_scale', source, overrides)
+        y_scale = self.get_property('y_scale', source, overrides)
+        color_bar = self.get_property('color_bar', source, overrides)
+        resolution = self.get_property('resolution', source, overrides)
+        
+        # get color bar
+        if not color_bar:
+            color_bar = self._color_bar
+        
+        # get visible cells
+        (x1, x2), (y1, y2) = self._limits
+        rows, cols = self._values.shape
+        
+        c1, c2 = self._crop_window(x1, x2, cols, x_scale.in_range)
+        r1, r2 = self._crop_window(y1, y2, rows, y_scale.in_range)
+        
+        if c1 == c2 or r1 == r2:
+            return
+        
+        # get resampled cells edges
+        col_edges = self._resample_edges(c1, c2, x1, x2, cols, x_scale, resolution)
+        row_edges = self._resample_edges(r1, r2, y1, y2, rows, y_scale, resolution)
+        
+        # resample values
+        values = self._resample(self._values[r1:r2, c1:c2], row_edges - r1, col_edges - c1)
+        
+        # get colors
+        colors = numpy.ascontiguousarray(color_bar.convert(values))
+        keys = colors.view(numpy.uint32)[:, :, 0]
+        
+        # merge adjacent cells of same color
+        starts = numpy.ones(keys.shape, dtype=bool)
+        starts[:, 1:] = keys[:, 1:] != keys[:, :-1]
+        
+        run_rows, run_starts = numpy.nonzero(starts)
+        run_ends = numpy.append(run_starts[1:], keys.shape[1])
+        run_ends[:-1][run_rows[1:] != run_rows[:-1]] = keys.shape[1]
+        
+        # remove transparent
+        run_colors = colors[run_rows, run_starts]
+        visible = run_colors[:, 3] > 0
+        
+        run_rows = run_rows[visible]
+        run_starts = run_starts[visible]
+        run_ends = run_ends[visible]
+        run_colors = run_colors[visible]
+        
+        # get rectangles
+        x_edges = x_scale.scale(x1 + (x2 - x1) * col_edges / cols)
+        y_edges = y_scale.scale(y1 + (y2 - y1) * row_edges / rows)
+        
+        xa = x_edges[run_starts]
+        xb = x_edges[run_ends]
+        ya = y_edges[run_rows]
+        yb = y_edges[run_rows + 1]
+        
+        x_data = numpy.minimum(xa, xb).tolist()
+        y_data = numpy.minimum(ya, yb).tolist()
+        width_data = numpy.abs(xb - xa).tolist()
+        height_data = numpy.abs(yb - ya).tolist()
+        
+        # group by colors
+        uniques, groups = utils.encode_values(keys[run_rows, run_starts])
+        indices = numpy.arange(len(groups))
+        
+        # start drawing group
+        with canvas.group(tag, "series"):
+            
+            # set pen
+            canvas.line_color = None
+            canvas.line_width = 0
+            
+            # draw cells by color
+            for group, group_indices in utils.split_groups(indices, groups):
+                
+                # set brush
+                canvas.fill_color = tuple(run_colors[group_indices[0]].tolist())
+                
+                # draw cells
+                for i in group_indices.tolist():
+                    canvas.draw_rect(x_data[i], y_data[i], width_data[i], height_data[i])
+    
+    
+    def _crop_extent(self, extent, crop):
+        """Crops given extent by specified range."""
+        
+        if not crop:
+            return extent
+        
+        lo = max(min(extent), min(crop))
+        hi = min(max(extent), max(crop))
+        
+        return (lo, hi) if lo <= hi else None
+    
+    
+    def _crop_window(self, start, end, size, crop):
+        """Gets indices of cells within given range."""
+        
+        # get relative positions
+        p1 = (crop[0] - start) / (end - start) * size
+        p2 = (crop[1] - start) / (end - start) * size
+        
+        # get indices
+        i1 = int(numpy.clip(numpy.floor(min(p1, p2)), 0, size))
+        i2 = int(numpy.clip(numpy.ceil(max(p1, p2)), 0, size))
+        
+        return i1, i2
+    
+    
+    def _resample_edges(self, i1, i2, start, end, size, scale, resolution):
+        """Gets edges of cells resampled to device resolution."""
+        
+        # get device size of the window
+        d1 = scale.scale(start + (end - start) * i1 / size)
+        d2 = scale.scale(start + (end - start) * i2 / size)
+        
+        # get step
+        count = max(1, int(abs(d2 - d1) / max(resolution, 1e-3)))
+        step = max(1, int(numpy.ceil((i2 - i1) / count)))
+        
+        # make edges
+        return numpy.append(numpy.arange(i1, i2, step), i2)
+    
+    
+    def _resample(self, values, row_edges, col_edges):
+        """Resamples given values by averaging within cells."""
+        
+        # check resampling
+        if len(row_edges) - 1 == values.shape[0] and len(col_edges) - 1 == values.shape[1]:
+            return values
+        
+        # sum values within cells
+        row_starts = row_edges[:-1]
+        col_starts = col_edges[:-1]
+        
+        counts = numpy.outer(numpy.diff(row_edges), numpy.diff(col_edges))
+        
+        if self._has_nan:
+            
+            missing = numpy.isnan(values)
+            values = numpy.where(missing, 0., values)
+            
+            counts = numpy.add.reduceat(numpy.add.reduceat(~missing, row_starts, axis=0, dtype=numpy.int64), col_starts, axis=1)
+        
+        sums = numpy.add.reduceat(numpy.add.reduceat(values, row_starts, axis=0), col_starts, axis=1)
+        
+        # calc average
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            return sums / counts
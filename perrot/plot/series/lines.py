@@ -5,11 +5,15 @@ import numpy
 
 from pero.enums import *
 from pero.properties import *
-from pero import Frame
+from pero import Head, LineProperties
 
 from . series import Series
+from . data import DataProperty, Records, Values
 from . import utils
 
+# define constants
+_STYLE_PROPS = tuple(p.name for p in LineProperties.properties())
+
 
 class Lines(Series):
     """
@@ -28,10 +32,22 @@ class Lines(Series):
     specified a sequence of internal raw data is created as ((x1,y1,x2,y2),)
     coordinates.
     
+    The 'line_color' and 'line_width' can also be specified as numpy.ndarray or
+    perrot.plot.Values of per-point values aligned with the data points.
+    
+    For drawing, the lines without heads are grouped by their resolved style
+    so that the pen is set only once per group. If any visible lines overlap,
+    only consecutive lines of the same style are grouped. If any head is set,
+    each line is drawn directly followed by its heads to keep their stacking
+    order.
+    Dynamic properties are evaluated only once and cached until the data or
+    the line properties are changed.
+    
     Properties:
         
-        data: tuple, list, numpy.ndarray or UNDEF
-            Specifies the sequence of the raw data points.
+        data: tuple, list, numpy.ndarray, dict, perrot.plot.DataSource or UNDEF
+            Specifies the sequence of the raw data points, a dict of data
+            columns or a shared data source.
         
         x1: int, float, tuple, list, numpy.ndarray, callable, None or UNDEF
             Specifies the sequence of start x-coordinates in real data units or
@@ -67,7 +83,7 @@ class Lines(Series):
             Includes pero.LineProperties to specify the line.
     """
     
-    data = Property(UNDEF, dynamic=False)
+    data = DataProperty(UNDEF, dynamic=False)
     x1 = Property(UNDEF)
     y1 = Property(UNDEF)
     x2 = Property(UNDEF)
@@ -83,6 +99,11 @@ class Lines(Series):
     def __init__(self, **overrides):
         """Initializes a new instance of Lines series base."""
         
+        # wrap per-point values
+        for name in ('line_color', 'line_width'):
+            if isinstance(overrides.get(name), numpy.ndarray):
+                overrides[name] = Values(overrides[name])
+        
         super().__init__(**overrides)
         
         # init buffers
@@ -94,6 +115,8 @@ class Lines(Series):
         self._x_data = []
         self._y_data = []
         self._raw_data = []
+        self._styles = None
+        self._sorted = None
         self._limits = None
         
         # extract data
@@ -106,6 +129,9 @@ class Lines(Series):
         self.lock_property('y1')
         self.lock_property('y2')
         self.lock_property('anchor')
+        
+        # bind events
+        self.bind(EVT_PROPERTY_CHANGED, self._on_lines_property_changed)
     
     
     def get_labels(self):
@@ -135,13 +161,15 @@ class Lines(Series):
             
             limits_start = utils.calc_points_limits(
                 data = (self._x1_data, self._y1_data),
-                crops = (x_range, y_range), 
-                extend = False)
+                crops = (x_range, y_range),
+                extend = False,
+                indices = self._get_sorted(('x1', 'y1')))
             
             limits_end = utils.calc_points_limits(
                 data = (self._x2_data, self._y2_data),
-                crops = (x_range, y_range), 
-                extend = False)
+                crops = (x_range, y_range),
+                extend = False,
+                indices = self._get_sorted(('x2', 'y2')))
             
             limits = utils.combine_limits(limits_start, limits_end)
         
@@ -161,8 +189,13 @@ class Lines(Series):
         self._x_data = []
         self._y_data = []
         self._raw_data = []
+        self._styles = None
+        self._sorted = None
         self._limits = None
         
+        # update revision
+        self._revision += 1
+        
         # get data size
         size = utils.extract_data_size(self, 'data', 'x1', 'x2', 'y1', 'y2')
         
@@ -187,9 +220,9 @@ class Lines(Series):
         
         # set raw data
         if self.data is not UNDEF:
-            self._raw_data = numpy.array(self.data)
+            self._raw_data = Records(self.data)
         else:
-            self._raw_data = numpy.array([x1_raw, y1_raw, x2_raw, y2_raw]).T
+            self._raw_data = Records(columns=(x1_raw, y1_raw, x2_raw, y2_raw))
         
         # init full limits
         if len(self._raw_data) > 0:
@@ -214,19 +247,11 @@ class Lines(Series):
         frame = self.get_property('frame', source, overrides)
         color = self.get_property('color', source, overrides)
         
-        # get heads overrides
-        start_head_overrides = self.get_child_overrides('start_head', overrides)
-        start_head_overrides_fin = start_head_overrides.copy()
-        
-        end_head_overrides = self.get_child_overrides('end_head', overrides)
-        end_head_overrides_fin = end_head_overrides.copy()
-        
         # get data
         x1_data = self._x1_data
         x2_data = self._x2_data
         y1_data = self._y1_data
         y2_data = self._y2_data
-        raw_data = self._raw_data
         
         # check data
         if len(x1_data) == 0:
@@ -238,75 +263,128 @@ class Lines(Series):
         y1_data = y_scale.scale(y1_data)
         y2_data = y_scale.scale(y2_data)
         
+        # get visible lines
+        indices = utils.cull_boxes(frame, x1_data, y1_data, x2_data, y2_data)
+        
+        # calc heads angles
+        angles = numpy.arctan2(y2_data - y1_data, x2_data - x1_data)
+        
+        # get styles
+        styles, groups = self._get_styles(overrides)
+        
+        # get heads
+        start_head = self.get_property('start_head', overrides=overrides, native=True)
+        end_head = self.get_property('end_head', overrides=overrides, native=True)
+        
         # start drawing group
         with canvas.group(tag, "series"):
             
-            # draw lines
-            for i, data in enumerate(raw_data):
+            # draw lines by style
+            if not start_head and not end_head:
+                
+                # keep stacking order of overlapping lines
+                widths = [style['line_width'] for style in styles if isinstance(style.get('line_width'), (int, float))]
+                pad = 0.5 * max(widths, default=1)
+                
+                x1_vis = numpy.minimum(x1_data[indices], x2_data[indices])
+                y1_vis = numpy.minimum(y1_data[indices], y2_data[indices])
+                x2_vis = numpy.maximum(x1_data[indices], x2_data[indices])
+                y2_vis = numpy.maximum(y1_data[indices], y2_data[indices])
+                
+                overlap = utils.boxes_overlap(x1_vis - pad, y1_vis - pad, x2_vis + pad, y2_vis + pad)
+                split = utils.split_runs if overlap else utils.split_groups
                 
-                # get coords
-                x1 = x1_data[i]
-                x2 = x2_data[i]
-                y1 = y1_data[i]
-                y2 = y2_data[i]
+                for group, group_indices in split(indices, groups):
+                    
+                    # set pen and brush
+                    canvas.line_color = color
+                    canvas.fill_color = None
+                    canvas.set_properties(styles[group])
+                    
+                    # draw lines
+                    for i in group_indices.tolist():
+                        canvas.draw_line(x1_data[i], y1_data[i], x2_data[i], y2_data[i])
                 
-                # apply clipping
-                bbox = Frame(x1, y1, x2-x1, y2-y1)
-                if not frame.overlaps(bbox):
-                    continue
+                return
+            
+            # get heads overrides
+            start_head_overrides = self.get_child_overrides('start_head', overrides)
+            end_head_overrides = self.get_child_overrides('end_head', overrides)
+            
+            # draw lines followed by their heads
+            for i in indices.tolist():
                 
                 # set pen and brush
                 canvas.line_color = color
                 canvas.fill_color = None
-                canvas.set_pen_by(self, source=data, overrides=overrides)
+                canvas.set_properties(styles[groups[i]])
                 
                 # draw line
-                canvas.draw_line(x1, y1, x2, y2)
+                canvas.draw_line(x1_data[i], y1_data[i], x2_data[i], y2_data[i])
                 
-                # draw start head
-                head = self.get_property('start_head', data, overrides)
-                if head:
-                    
-                    # get head colors
-                    line_color = head.get_property('line_color', overrides=start_head_overrides, native=True)
-                    if line_color is UNDEF:
-                        line_color = color
-                    
-                    fill_color = head.get_property('fill_color', overrides=start_head_overrides, native=True)
-                    if fill_color is UNDEF:
-                        fill_color = color
-                    
-                    # set overrides
-                    start_head_overrides_fin['x'] = x1
-                    start_head_overrides_fin['y'] = y1
-                    start_head_overrides_fin['angle'] = numpy.arctan2(y2-y1, x2-x1)+numpy.pi
-                    start_head_overrides_fin['angle_units'] = ANGLE_RAD
-                    start_head_overrides_fin['line_color'] = line_color
-                    start_head_overrides_fin['fill_color'] = fill_color
-                    
-                    # draw head
-                    head.draw(canvas, data, **start_head_overrides_fin)
+                # draw heads
+                if start_head:
+                    self._draw_head(canvas, 'start_head', start_head, i, x1_data[i], y1_data[i], angles[i]+numpy.pi, color, start_head_overrides, overrides)
                 
-                # draw end head
-                head = self.get_property('end_head', data, overrides)
-                if head:
-                    
-                    # get head colors
-                    line_color = head.get_property('line_color', overrides=end_head_overrides, native=True)
-                    if line_color is UNDEF:
-                        line_color = color
-                    
-                    fill_color = head.get_property('fill_color', overrides=end_head_overrides, native=True)
-                    if fill_color is UNDEF:
-                        fill_color = color
-                    
-                    # set overrides
-                    end_head_overrides_fin['x'] = x2
-                    end_head_overrides_fin['y'] = y2
-                    end_head_overrides_fin['angle'] = numpy.arctan2(y2-y1, x2-x1)
-                    end_head_overrides_fin['angle_units'] = ANGLE_RAD
-                    end_head_overrides_fin['line_color'] = line_color
-                    end_head_overrides_fin['fill_color'] = fill_color
-                    
-                    # draw head
-                    head.draw(canvas, data, **end_head_overrides_fin)
+                if end_head:
+                    self._draw_head(canvas, 'end_head', end_head, i, x2_data[i], y2_data[i], angles[i], color, end_head_overrides, overrides)
+    
+    
+    def _draw_head(self, canvas, name, head, idx, x, y, angle, color, head_overrides, overrides):
+        """Draws head of given line."""
+        
+        # get head
+        data = self._raw_data[idx]
+        if callable(head) and not isinstance(head, Head):
+            head = self.get_property(name, data, overrides)
+            if not head:
+                return
+        
+        # get head colors
+        line_color = head.get_property('line_color', overrides=head_overrides, native=True)
+        if line_color is UNDEF:
+            line_color = color
+        
+        fill_color = head.get_property('fill_color', overrides=head_overrides, native=True)
+        if fill_color is UNDEF:
+            fill_color = color
+        
+        # set overrides
+        head_overrides_fin = head_overrides.copy()
+        head_overrides_fin['x'] = x
+        head_overrides_fin['y'] = y
+        head_overrides_fin['angle'] = angle
+        head_overrides_fin['angle_units'] = ANGLE_RAD
+        head_overrides_fin['line_color'] = line_color
+        head_overrides_fin['fill_color'] = fill_color
+        
+        # draw head
+        head.draw(canvas, data, **head_overrides_fin)
+    
+    
+    def _get_styles(self, overrides):
+        """Gets unique styles and style index of each line."""
+        
+        # check overrides
+        cache = not any(name in overrides for name in _STYLE_PROPS)
+        
+        # use cached styles
+        if cache and self._styles is not None:
+            return self._styles
+        
+        # group by styles
+        styles = utils.group_styles(self, _STYLE_PROPS, self._raw_data, overrides)
+        
+        # store cache
+        if cache:
+            self._styles = styles
+        
+        return styles
+    
+    
+    def _on_lines_property_changed(self, evt):
+        """Called after any property has changed."""
+        
+        # reset styles
+        if evt.name in _STYLE_PROPS:
+            self._styles = None
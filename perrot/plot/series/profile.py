@@ -7,6 +7,8 @@ from pero.enums import *
 from pero.properties import *
 
 from . import utils
+from ..enums import *
+from .data import DataProperty, Pyramid, Records
 from .series import Series
 
 
@@ -37,6 +39,27 @@ class Profile(Series):
     filled polygon either by connecting first and last points directly or using
     strait line defined by the 'base' property.
     
+    Missing values can be specified as NaN within the y-coordinates. In such
+    case the profile is split into separate segments at each gap.
+    
+    If the 'decimate' property is enabled, dense data are reduced for drawing
+    to the first, last, minimum and maximum point within each device pixel
+    column, so that the line looks the same while the number of drawn points
+    depends on the plot width rather than on the data size. The points are
+    never reduced if the 'show_points' property is set to True or if the
+    'steps' are used, since the steps would be constructed from the reduced
+    points only.
+    
+    The minimum and maximum of the y-coordinates within buckets of
+    power-of-two sizes are precomputed at extraction, so that the limits of
+    any x-range are calculated from a few buckets instead of scanning all the
+    visible data. This takes additional memory of roughly a quarter of the
+    64-bit y-coordinates. For very large data the 'pyramid' property can be
+    enabled to keep also the indices of the extremes, which doubles the
+    memory. The drawing then uses the extreme points of the buckets matching
+    current number of points per device pixel, so that the raw data are not
+    scanned at coarse zoom.
+    
     Properties:
         
         show_line: bool
@@ -50,16 +73,19 @@ class Profile(Series):
         show_area: bool
             Specifies whether the area under profile line should be displayed.
         
-        data: tuple, list, numpy.ndarray or UNDEF
-            Specifies the sequence of the raw data points.
+        data: tuple, list, numpy.ndarray, dict, perrot.plot.DataSource or UNDEF
+            Specifies the sequence of the raw data points, a dict of data
+            columns or a shared data source.
         
-        x: int, float, tuple, list, numpy.ndarray, callable, None or UNDEF
+        x: int, float, tuple, list, numpy.ndarray, str, callable, None or UNDEF
             Specifies the sequence of x-coordinates in real data units or a
-            function to retrieve the coordinates from the raw data.
+            function to retrieve the coordinates from the raw data. If
+            specified as a path to .npy file, the data are memory-mapped.
         
-        y: int, float, tuple, list, numpy.ndarray, callable, None or UNDEF
+        y: int, float, tuple, list, numpy.ndarray, str, callable, None or UNDEF
             Specifies the sequence of y-coordinates in real data units or a
-            function to retrieve the coordinates from the raw data.
+            function to retrieve the coordinates from the raw data. If
+            specified as a path to .npy file, the data are memory-mapped.
         
         base: int, float, None or UNDEF
             Specifies the area base value in real data units.
@@ -77,6 +103,25 @@ class Profile(Series):
             Specifies the minimum x-distance between points in device units to
             enable automatic points display.
         
+        storage: perrot.plot.STORAGE
+            Specifies the type used to store the coordinates as any item from
+            the perrot.plot.STORAGE enum. Compact types reduce memory, while
+            the coordinates are converted to 64-bit floats for visible range
+            only.
+        
+        autosort: bool
+            Specifies whether the data should be sorted automatically by
+            x-coordinates if not sorted already. If set to False, unsorted
+            data raise an error.
+        
+        decimate: bool
+            Specifies whether dense data should be reduced for drawing. The
+            reduction is never applied to stepped profiles.
+        
+        pyramid: bool
+            Specifies whether the indices of the extremes should be kept to
+            speed up drawing of very large data.
+        
         line properties:
             Includes pero.LineProperties to specify the line.
         
@@ -88,7 +133,7 @@ class Profile(Series):
     show_points = BoolProperty(UNDEF, dynamic=False)
     show_area = BoolProperty(False, dynamic=False)
 
-    data = SequenceProperty(UNDEF, dynamic=False)
+    data = DataProperty(UNDEF, dynamic=False)
     x = Property(UNDEF)
     y = Property(UNDEF)
     base = NumProperty(UNDEF, dynamic=False, nullable=True)
@@ -96,6 +141,10 @@ class Profile(Series):
     steps = EnumProperty(None, enum=LINE_STEP, nullable=True)
     marker = MarkerProperty('o', nullable=True)
     spacing = NumProperty(20, dynamic=False)
+    storage = EnumProperty(STORAGE_FLOAT64, enum=STORAGE, dynamic=False)
+    autosort = BoolProperty(False, dynamic=False)
+    decimate = BoolProperty(True, dynamic=False)
+    pyramid = BoolProperty(False, dynamic=False)
 
     line = Include(LineProperties, line_color=UNDEF, dynamic=False)
     fill = Include(FillProperties, fill_color=UNDEF, dynamic=False)
@@ -112,20 +161,25 @@ class Profile(Series):
         self._x_data = []
         self._y_data = []
         self._raw_data = []
+        self._buffers = None
+        self._pyramid = None
         self._limits = None
 
         # extract data
         self.extract_data()
 
+        # lock properties
+        self.lock_property('pyramid')
+
     def get_labels(self):
         """Gets series labels."""
 
-        return self.make_labels(self._x_data, self._y_data, self._raw_data)
+        return self.make_labels(self._x_data, self._y_data, self._raw_data, x_sorted=True)
 
     def get_tooltip(self, x, y, limit):
         """Gets nearest data point tooltip."""
 
-        return self.make_tooltip(self._x_data, self._y_data, self._raw_data, x, y, limit)
+        return self.make_tooltip(self._x_data, self._y_data, self._raw_data, x, y, limit, x_sorted=True)
 
     def get_limits(self, x_range=None, y_range=None, exact=False):
         """Gets current data limits using whole range or specified crops."""
@@ -144,7 +198,8 @@ class Profile(Series):
                 data=(self._x_data, self._y_data),
                 crop=x_range,
                 extend=False,
-                interpolate=True)
+                interpolate=True,
+                pyramids=(None, self._pyramid) if self._pyramid is not None else None)
 
             if self.base not in (UNDEF, None) and limits[1] is not None:
                 limits[1][0] = min(self.base, limits[1][0])
@@ -160,30 +215,109 @@ class Profile(Series):
         self._x_data = []
         self._y_data = []
         self._raw_data = []
+        self._buffers = None
+        self._pyramid = None
         self._limits = None
 
+        # update revision
+        self._revision += 1
+
         # get data size
         size = utils.extract_data_size(self, 'data', 'x', 'y')
 
         # extract data
-        self._x_data, x_raw = utils.extract_data(self, 'x', self.data, size, self.x_mapper)
-        self._y_data, y_raw = utils.extract_data(self, 'y', self.data, size, self.y_mapper)
+        self._x_data, x_raw = utils.extract_data(self, 'x', self.data, size, self.x_mapper, storage=self.storage, mmap=True)
+        self._y_data, y_raw = utils.extract_data(self, 'y', self.data, size, self.y_mapper, storage=self.storage, mmap=True)
 
         # set raw data
         if self.data is not UNDEF:
-            self._raw_data = numpy.array(self.data)
+            self._raw_data = Records(self.data)
         else:
-            self._raw_data = numpy.array([x_raw, y_raw]).T
+            self._raw_data = Records(columns=(x_raw, y_raw))
 
         # check data
         if not utils.is_sorted(self._x_data):
-            raise ValueError("X-coordinates must be sorted!")
+
+            if not self.autosort:
+                raise ValueError("X-coordinates must be sorted!")
+
+            # sort data
+            order = numpy.argsort(self._x_data, kind='stable')
+            self._x_data = utils.store_data(self._x_data[order], self.storage)
+            self._y_data = utils.store_data(self._y_data[order], self.storage)
+            self._raw_data = self._raw_data[order]
 
         # init full limits
         if len(self._raw_data) > 0:
             self._limits = (
-                (self._x_data.min(), self._x_data.max()),
-                (self._y_data.min(), self._y_data.max()))
+                (self._x_data[0], self._x_data[-1]),
+                utils.calc_limits(self._y_data)[0])
+
+        # init pyramid
+        if len(self._raw_data) > 0:
+            self._pyramid = Pyramid(self._y_data, indices=self.pyramid)
+
+    def append(self, data=UNDEF, x=UNDEF, y=UNDEF):
+        """
+        Appends new data points to the series. The points can be provided
+        either as raw data points, from which the coordinates are extracted by
+        current 'x' and 'y' selectors, or directly by the coordinates
+        values. Raw data must be provided if the series was created from raw
+        'data'.
+
+        The data are stored in growable buffers so that the amortized cost of
+        appending, including the limits update, is proportional to the number
+        of new points only. The new points are expected to continue the
+        x-sorted sequence, which is verified for the new points only. If they
+        do not, the whole data are sorted if 'autosort' is enabled, otherwise
+        an error is raised. Note that the coordinates properties are not
+        updated by appended points. Values stored in quantized storage are
+        converted to 64-bit floats on first append.
+
+        Args:
+            data: (any,), numpy.ndarray or UNDEF
+                Raw data points to append.
+
+            x: float, (float,), numpy.ndarray or UNDEF
+                X-coordinates of the points to append.
+
+            y: float, (float,), numpy.ndarray or UNDEF
+                Y-coordinates of the points to append.
+        """
+
+        # extract new points
+        final, raw = self._extract_appended(('x', 'y'), data, {'x': x, 'y': y})
+        if len(final['x']) == 0:
+            return
+
+        # check order of new points
+        x_new = final['x']
+        ordered = utils.is_sorted(x_new) and (len(self._x_data) == 0 or x_new[0] >= self._x_data[-1])
+
+        if not ordered and not self.autosort:
+            raise ValueError("X-coordinates must be sorted!")
+
+        # store points
+        self._append_data(('x', 'y'), data, final, raw)
+
+        # sort data
+        if not ordered:
+            self._sort_buffers(('x', 'y'), numpy.argsort(self._x_data, kind='stable'))
+
+        # update pyramid
+        if self._pyramid is None or not ordered:
+            self._pyramid = Pyramid(self._y_data, indices=self.pyramid)
+        else:
+            self._pyramid.extend(self._y_data)
+
+        # update full limits
+        y_limits = utils.combine_limits(
+            [self._limits[1]] if self._limits else None,
+            utils.calc_limits(final['y']))
+
+        self._limits = (
+            (self._x_data[0], self._x_data[-1]),
+            y_limits[0] if y_limits else None)
 
     def draw(self, canvas, source=UNDEF, **overrides):
         """Uses given canvas to draw the series."""
@@ -198,18 +332,33 @@ class Profile(Series):
         y_scale = self.get_property('y_scale', source, overrides)
         base = self.get_property('base', source, overrides)
         color = self.get_property('color', source, overrides)
+        decimate = self.get_property('decimate', source, overrides)
+        steps = self.get_property('steps', source, overrides)
+        show_points = self.get_property('show_points', source, overrides)
 
         # set overrides to ignore
-        ignore = {'x', 'y', 'base', 'line_color', 'fill_color'}
+        ignore = {'data', 'x', 'y', 'base', 'line_color', 'fill_color'}
 
         # crop data
         i1, i2 = utils.crop_indices(self._x_data, x_scale.in_range, True)
         if i1 == i2:
             return
 
-        x_data = self._x_data[i1:i2]
-        y_data = self._y_data[i1:i2]
-        raw_data = self._raw_data[i1:i2]
+        # select extreme points of dense data
+        indices = None
+        if self.pyramid and self._pyramid is not None and show_points is not True:
+            width = abs(x_scale.out_range[1] - x_scale.out_range[0])
+            indices = self._pyramid.select(i1, i2, 0.5 * (i2 - i1) / max(1, width))
+
+        if indices is not None:
+            x_data = numpy.asarray(self._x_data[indices], dtype=numpy.float64)
+            y_data = numpy.asarray(self._y_data[indices], dtype=numpy.float64)
+            raw_data = self._raw_data[indices]
+
+        else:
+            x_data = numpy.asarray(self._x_data[i1:i2], dtype=numpy.float64)
+            y_data = numpy.asarray(self._y_data[i1:i2], dtype=numpy.float64)
+            raw_data = self._raw_data[i1:i2]
 
         # scale coords
         x_data = x_scale.scale(x_data)
@@ -236,11 +385,33 @@ class Profile(Series):
 
             # set overrides
             glyph_overrides = overrides.copy()
-            glyph_overrides['x'] = x_data
-            glyph_overrides['y'] = y_data
             glyph_overrides['base'] = base
             glyph_overrides['line_color'] = line_color
             glyph_overrides['fill_color'] = fill_color
 
-            # draw profile
-            self._glyph.draw(canvas, raw_data, **glyph_overrides)
+            # draw segments between gaps
+            for s1, s2 in utils.split_gaps(y_data):
+
+                # get segment
+                seg_x_data = x_data[s1:s2]
+                seg_y_data = y_data[s1:s2]
+                seg_raw_data = raw_data[s1:s2]
+
+                # reduce dense segment
+                if decimate and steps in (None, LINE_STEP.NONE) and show_points is not True:
+                    indices = utils.decimate_points(seg_x_data, seg_y_data)
+                    if indices is not None:
+                        seg_x_data = seg_x_data[indices]
+                        seg_y_data = seg_y_data[indices]
+                        seg_raw_data = seg_raw_data[indices]
+
+                # set segment overrides
+                glyph_overrides['x'] = seg_x_data
+                glyph_overrides['y'] = seg_y_data
+
+                # set visible records for points
+                if show_points is not False:
+                    glyph_overrides['data'] = numpy.asarray(seg_raw_data)
+
+                # draw profile
+                self._glyph.draw(canvas, seg_raw_data, **glyph_overrides)
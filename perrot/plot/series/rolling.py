@@ -0,0 +1,300 @@
+#  Created byMartin.cz
+#  Copyright (c) Martin Strohalm. All rights reserved.
+
+import numpy
+from collections import deque
+
+from pero.properties import *
+
+from . profile import Profile
+from . data import Pyramid, Records
+from . import utils
+
+
+class Rolling(Profile):
+    """
+    This type of series plots a rolling window of the last x-sorted points as
+    continuous line, typically used for live monitoring. The points are stored
+    in fixed-size circular buffer, so that appending new points by the
+    'append' method costs constant time per point and the oldest points are
+    dropped automatically as soon as the 'capacity' is reached. Initial points
+    can be provided the same way as for perrot.plot.Profile, in which case only
+    the last points fitting into the window are kept. The points are cut to
+    the window before they are checked for order, sorted or stored, so only
+    the kept points are expected to be x-sorted.
+    
+    The y-limits of the window are maintained by monotonic queues so the full
+    limits are always available in constant time. If the 'follow' property is
+    enabled, the plot shifts current x-axis range to the newest data on the
+    next drawing after the window has changed and rescales dependent axes
+    accordingly. Any zooming in between is kept until new data arrive. The min/max pyramid is kept only if the 'pyramid' property is enabled, in
+    which case it covers the whole circular buffer and only the buckets of
+    the overwritten points are updated on append.
+    
+    If raw 'data' property is not specified, internal raw data are created as
+    ((x,y),) final coordinates.
+    
+    Properties:
+        
+        capacity: int
+            Specifies the maximum number of points in the window.
+        
+        follow: bool
+            Specifies whether the x-axis should follow the newest data.
+    """
+    
+    capacity = IntProperty(1000, dynamic=False)
+    follow = BoolProperty(True, dynamic=False)
+    
+    
+    def __init__(self, **overrides):
+        """Initializes a new instance of Rolling series."""
+        
+        # init window
+        self._x_ring = None
+        self._y_ring = None
+        self._raw_ring = None
+        self._head = 0
+        self._count = 0
+        self._total = 0
+        self._min_queue = deque()
+        self._max_queue = deque()
+        
+        super().__init__(**overrides)
+        
+        # lock properties
+        self.lock_property('capacity')
+    
+    
+    def extract_data(self):
+        """Extracts coordinates of the last points fitting into the window."""
+        
+        # reset buffers
+        self._buffers = None
+        self._pyramid = None
+        self._limits = None
+        
+        # init window
+        capacity = max(1, self.capacity)
+        
+        self._x_ring = numpy.full(2*capacity, numpy.nan)
+        self._y_ring = numpy.full(2*capacity, numpy.nan)
+        self._raw_ring = None
+        self._head = 0
+        self._count = 0
+        self._total = 0
+        self._min_queue.clear()
+        self._max_queue.clear()
+        
+        if self.data is not UNDEF:
+            self._raw_ring = numpy.empty(2*capacity, dtype=object)
+        
+        # get data size
+        size = utils.extract_data_size(self, 'data', 'x', 'y')
+        
+        # extract data
+        x_data = utils.extract_data(self, 'x', self.data, size, self.x_mapper, mmap=True)[0]
+        y_data = utils.extract_data(self, 'y', self.data, size, self.y_mapper, mmap=True)[0]
+        
+        # keep last points only
+        x_data = numpy.asarray(x_data[-capacity:], dtype=numpy.float64)
+        y_data = numpy.asarray(y_data[-capacity:], dtype=numpy.float64)
+        raw_data = list(Records(self.data)[-capacity:]) if self._raw_ring is not None else None
+        
+        # check data
+        if not utils.is_sorted(x_data):
+            
+            if not self.autosort:
+                raise ValueError("X-coordinates must be sorted!")
+            
+            # sort data
+            order = numpy.argsort(x_data, kind='stable')
+            x_data = x_data[order]
+            y_data = y_data[order]
+            
+            if raw_data is not None:
+                raw_data = [raw_data[i] for i in order]
+        
+        # fill window
+        self._push(x_data, y_data, raw_data)
+        
+        # init pyramid
+        if self.pyramid:
+            self._pyramid = _WindowPyramid(self._y_ring)
+        
+        self._update_window()
+    
+    
+    def append(self, data=UNDEF, x=UNDEF, y=UNDEF):
+        """
+        Appends new data points into the window. The points can be provided
+        either as raw data points, from which the coordinates are extracted by
+        current 'x' and 'y' selectors, or directly by the coordinates values.
+        Raw data must be provided if the series was created from raw 'data'.
+        The new points must continue the x-sorted sequence.
+        
+        Args:
+            data: (any,), numpy.ndarray or UNDEF
+                Raw data points to append.
+            
+            x: float, (float,), numpy.ndarray or UNDEF
+                X-coordinates of the points to append.
+            
+            y: float, (float,), numpy.ndarray or UNDEF
+                Y-coordinates of the points to append.
+        """
+        
+        # extract new points
+        final, raw = self._extract_appended(('x', 'y'), data, {'x': x, 'y': y})
+        if len(final['x']) == 0:
+            return
+        
+        # check order of new points
+        x_new = final['x']
+        if not utils.is_sorted(x_new) or (self._count and x_new[0] < self._x_data[-1]):
+            raise ValueError("X-coordinates must be sorted!")
+        
+        # keep last points only
+        capacity = len(self._x_ring) // 2
+        raw_data = list(data[-capacity:]) if self._raw_ring is not None else None
+        
+        # add points
+        pos = (self._head + self._count) % capacity
+        count = min(len(x_new), capacity)
+        
+        self._push(x_new[-capacity:], final['y'][-capacity:], raw_data)
+        
+        # update pyramid
+        if self._pyramid is not None:
+            
+            end = pos + count
+            for i1, i2 in ((pos, min(end, capacity)), (0, end - capacity)):
+                if i1 < i2:
+                    self._pyramid.update(i1, i2)
+                    self._pyramid.update(i1 + capacity, i2 + capacity)
+        
+        self._update_window()
+    
+    
+    def _push(self, x_data, y_data, raw_data):
+        """Adds given points into the window."""
+        
+        capacity = len(self._x_ring) // 2
+        
+        for i in range(len(x_data)):
+            
+            # get position
+            if self._count < capacity:
+                pos = (self._head + self._count) % capacity
+                self._count += 1
+            else:
+                pos = self._head
+                self._head = (self._head + 1) % capacity
+            
+            # store point twice to keep window contiguous
+            x = x_data[i]
+            y = y_data[i]
+            
+            self._x_ring[pos] = self._x_ring[pos + capacity] = x
+            self._y_ring[pos] = self._y_ring[pos + capacity] = y
+            
+            if raw_data is not None:
+                self._raw_ring[pos] = self._raw_ring[pos + capacity] = raw_data[i]
+            
+            # update queues
+            idx = self._total
+            self._total += 1
+            
+            if y == y:
+                
+                while self._min_queue and self._min_queue[-1][1] >= y:
+                    self._min_queue.pop()
+                self._min_queue.append((idx, y))
+                
+                while self._max_queue and self._max_queue[-1][1] <= y:
+                    self._max_queue.pop()
+                self._max_queue.append((idx, y))
+            
+            # remove expired
+            start = self._total - self._count
+            
+            while self._min_queue and self._min_queue[0][0] < start:
+                self._min_queue.popleft()
+            
+            while self._max_queue and self._max_queue[0][0] < start:
+                self._max_queue.popleft()
+    
+    
+    def _update_window(self):
+        """Sets current data and limits from the window."""
+        
+        # get window views
+        i1 = self._head
+        i2 = self._head + self._count
+        
+        self._x_data = self._x_ring[i1:i2]
+        self._y_data = self._y_ring[i1:i2]
+        
+        self._x_data.flags.writeable = False
+        self._y_data.flags.writeable = False
+        
+        # set raw data
+        if self._raw_ring is not None:
+            self._raw_data = Records(self._raw_ring[i1:i2])
+        else:
+            self._raw_data = Records(columns=(self._x_data, self._y_data))
+        
+        # update revision
+        self._revision += 1
+        
+        # set full limits
+        self._limits = None
+        
+        if self._count:
+            
+            y_limits = None
+            if self._min_queue:
+                y_limits = (self._min_queue[0][1], self._max_queue[0][1])
+            
+            self._limits = (
+                (self._x_data[0], self._x_data[-1]),
+                y_limits)
+        
+        # shift pyramid
+        if self._pyramid is not None:
+            self._pyramid.offset = self._head
+
+
+class _WindowPyramid(object):
+    """Provides pyramid of the circular buffer shifted to current window."""
+    
+    
+    def __init__(self, ring):
+        """Initializes a new instance of _WindowPyramid."""
+        
+        self._ring = ring
+        self._pyramid = Pyramid(ring)
+        
+        self.offset = 0
+    
+    
+    def update(self, start, end):
+        """Updates pyramid by values overwritten within given ring range."""
+        
+        self._pyramid.update(self._ring, start, end)
+    
+    
+    def get_limits(self, data, start, end):
+        """Gets minimum and maximum within given window range."""
+        
+        return self._pyramid.get_limits(self._ring, start + self.offset, end + self.offset)
+    
+    
+    def select(self, start, end, stride):
+        """Gets indices of the extremes within given window range."""
+        
+        indices = self._pyramid.select(start + self.offset, end + self.offset, stride)
+        if indices is None:
+            return None
+        
+        return indices - self.offset
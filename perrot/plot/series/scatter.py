@@ -5,11 +5,18 @@ import numpy
 
 from pero.enums import *
 from pero.properties import *
-from pero import Frame
+from pero import Marker, Symbol, Matrix, LineProperties, FillProperties, LinScale
 
+from .. colorbar import ColorBar
 from . series import Series
+from . heatmap import Heatmap
+from . data import Column, DataProperty, GridIndex, Records, Values
 from . import utils
 
+# define constants
+_BATCH_MARKERS = (MARKER_ASTERISK, MARKER_CIRCLE, MARKER_CROSS, MARKER_DIAMOND, MARKER_PLUS, MARKER_TRIANGLE, MARKER_SQUARE)
+_STYLE_PROPS = tuple(p.name for p in LineProperties.properties() + FillProperties.properties())
+
 
 class Scatter(Series):
     """
@@ -26,16 +33,44 @@ class Scatter(Series):
     'data' property is not specified a sequence of internal raw data is created
     as ((x,y),) coordinates.
     
+    The 'marker_size', 'marker_line_color', 'marker_line_width' and
+    'marker_fill_color' can also be specified as numpy.ndarray or
+    perrot.plot.Values of per-point values aligned with the data points. For
+    drawing, the markers are grouped by their resolved style so that the pen
+    and brush are set only once per group. If any visible markers overlap,
+    only consecutive markers of the same style are grouped to keep their
+    stacking order. Dynamic properties are evaluated only once and cached
+    until the data or the marker properties are changed.
+    
+    For very large data the visible points can be drawn as density instead of
+    individual markers. In such case the points are counted within cells of
+    a regular grid of the size specified by the 'density_resolution' property
+    and the counts are drawn as perrot.plot.Heatmap using the 'density_bar'
+    color bar. The grid is regular in device units, so that the cells keep
+    their size on non-linear axes too. The counts are recalculated for
+    current view on each drawing while the internal heatmap and its color
+    bar are reused.
+    If the 'density' property is set to UNDEF, the density is used
+    automatically as soon as the number of visible points exceeds the
+    'density_limit'.
+    
+    If the 'spatial_index' property is enabled, the limits cropped by both x
+    and y range are calculated using a grid index of the points, which is
+    created on first use. The costs of such calculation then depend on the
+    number of grid cells within the range rather than on the number of
+    points.
+    
     Properties:
         
-        data: tuple, list, numpy.ndarray or UNDEF
-            Specifies the sequence of the raw data points.
+        data: tuple, list, numpy.ndarray, dict, perrot.plot.DataSource or UNDEF
+            Specifies the sequence of the raw data points, a dict of data
+            columns or a shared data source.
         
-        x: int, float, tuple, list, numpy.ndarray, callable, None or UNDEF
+        x: int, float, tuple, list, numpy.ndarray, perrot.plot.Column, callable, None or UNDEF
             Specifies the sequence of x-coordinates in real data units or a
             function to retrieve the coordinates from the raw data.
         
-        y: int, float, tuple, list, numpy.ndarray, callable, None or UNDEF
+        y: int, float, tuple, list, numpy.ndarray, perrot.plot.Column, callable, None or UNDEF
             Specifies the sequence of y-coordinates in real data units or a
             function to retrieve the coordinates from the raw data.
         
@@ -43,25 +78,63 @@ class Scatter(Series):
             Specifies the marker glyph to draw actual data points with. The
             value can be specified by any item from the pero.MARKER enum or
             as an pero.Marker instance.
+        
+        density: bool or UNDEF
+            Specifies whether the points should be drawn as density. If set to
+            UNDEF, the density is used automatically for many points.
+        
+        density_limit: int
+            Specifies the maximum number of visible points drawn as individual
+            markers if the 'density' is set to UNDEF.
+        
+        density_resolution: int or float
+            Specifies the size of the density cells in device units.
+        
+        density_bar: perrot.plot.ColorBar or UNDEF
+            Specifies the color bar to convert points counts into colors. If
+            not specified, the colors are scaled to the full range of current
+            counts.
+        
+        spatial_index: bool
+            Specifies whether the grid index should be used to calculate the
+            limits cropped by both x and y range.
     """
     
-    data = SequenceProperty(UNDEF, dynamic=False)
+    data = DataProperty(UNDEF, dynamic=False)
     
-    x = Property(lambda d: d[0])
-    y = Property(lambda d: d[1])
+    x = Property(Column(0))
+    y = Property(Column(1))
     
     marker = MarkerProperty(MARKER_CIRCLE)
     
+    density = BoolProperty(UNDEF, dynamic=False)
+    density_limit = IntProperty(200000, dynamic=False)
+    density_resolution = NumProperty(2, dynamic=False)
+    density_bar = Property(UNDEF, types=(ColorBar,), dynamic=False, nullable=True)
+    
+    spatial_index = BoolProperty(False, dynamic=False)
+    
     
     def __init__(self, **overrides):
         """Initializes a new instance of Scatter series."""
         
+        # wrap per-point values
+        for name in ('marker_size', 'marker_line_color', 'marker_line_width', 'marker_fill_color'):
+            if isinstance(overrides.get(name), numpy.ndarray):
+                overrides[name] = Values(overrides[name])
+        
         super().__init__(**overrides)
         
         # init buffers
         self._x_data = []
         self._y_data = []
         self._raw_data = []
+        self._buffers = None
+        self._styles = None
+        self._sizes = None
+        self._sorted = None
+        self._grid = None
+        self._density = None
         self._limits = None
         
         # extract data
@@ -71,6 +144,12 @@ class Scatter(Series):
         self.lock_property('data')
         self.lock_property('x')
         self.lock_property('y')
+        
+        # bind events
+        self.bind(EVT_PROPERTY_CHANGED, self._on_scatter_property_changed)
+        
+        if isinstance(self.marker, Marker):
+            self.marker.bind(EVT_PROPERTY_CHANGED, self._on_marker_property_changed)
     
     
     def get_labels(self):
@@ -95,13 +174,22 @@ class Scatter(Series):
         # init limits
         limits = self._limits
         
+        # apply crop by grid index
+        if x_range and y_range and self.spatial_index:
+            
+            if self._grid is None:
+                self._grid = GridIndex(self._x_data, self._y_data)
+            
+            limits = self._grid.get_limits(x_range, y_range)
+        
         # apply crop
-        if x_range or y_range:
+        elif x_range or y_range:
             
             limits = utils.calc_points_limits(
                 data = (self._x_data, self._y_data),
-                crops = (x_range, y_range), 
-                extend = False)
+                crops = (x_range, y_range),
+                extend = False,
+                indices = self._get_sorted(('x', 'y')))
         
         # finalize limits
         return self.finalize_limits(limits, exact)
@@ -114,8 +202,16 @@ class Scatter(Series):
         self._x_data = []
         self._y_data = []
         self._raw_data = []
+        self._buffers = None
+        self._styles = None
+        self._sizes = None
+        self._sorted = None
+        self._grid = None
         self._limits = None
         
+        # update revision
+        self._revision += 1
+        
         # get data size
         size = utils.extract_data_size(self, 'data', 'x', 'y')
         
@@ -125,9 +221,9 @@ class Scatter(Series):
         
         # set raw data
         if self.data is not UNDEF:
-            self._raw_data = numpy.array(self.data)
+            self._raw_data = Records(self.data)
         else:
-            self._raw_data = numpy.array([x_raw, y_raw]).T
+            self._raw_data = Records(columns=(x_raw, y_raw))
         
         # init full limits
         if len(self._raw_data) > 0:
@@ -136,6 +232,72 @@ class Scatter(Series):
                 (self._y_data.min(), self._y_data.max()))
     
     
+    def append(self, data=UNDEF, x=UNDEF, y=UNDEF, **values):
+        """
+        Appends new data points to the series. The points can be provided
+        either as raw data points, from which the coordinates are extracted by
+        current 'x' and 'y' selectors, or directly by the 'x' and 'y' values.
+        Raw data must be provided if the series was created from raw 'data'.
+        
+        The data are stored in growable buffers so that the amortized cost of
+        appending, including the limits update, is proportional to the number
+        of new points only. Note that the 'data', 'x' and 'y' properties are
+        not updated by appended points.
+        
+        If any of the marker properties is specified as per-point values,
+        the values for the new points must be provided as well by the
+        corresponding keyword argument (e.g. 'marker_size').
+        
+        Args:
+            data: (any,), numpy.ndarray or UNDEF
+                Raw data points to append.
+            
+            x: float, (float,), numpy.ndarray or UNDEF
+                X-coordinates of the points to append.
+            
+            y: float, (float,), numpy.ndarray or UNDEF
+                Y-coordinates of the points to append.
+            
+            values: {str: (any,) or numpy.ndarray}
+                Per-point values of the new points for marker properties
+                specified as perrot.plot.Values.
+        """
+        
+        # extract new points
+        final, raw = self._extract_appended(('x', 'y'), data, {'x': x, 'y': y})
+        
+        # check per-point values
+        appended = self._get_appended_values(len(final['x']), values)
+        
+        if len(final['x']) == 0:
+            return
+        
+        # store points
+        self._append_data(('x', 'y'), data, final, raw)
+        
+        # store per-point values
+        marker = self.get_property('marker', native=True)
+        for name, value in appended.items():
+            marker.set_property(name, value)
+        
+        # reset styles
+        self._styles = None
+        self._sizes = None
+        
+        # reset grid index
+        self._grid = None
+        
+        # update sorted indices
+        if self._sorted:
+            for name, index in self._sorted.items():
+                index.extend(getattr(self, '_%s_data' % name))
+        
+        # update full limits
+        self._limits = utils.combine_limits(
+            self._limits,
+            utils.calc_limits(final['x'], final['y']))
+    
+    
     def draw(self, canvas, source=UNDEF, **overrides):
         """Uses given canvas to draw the series."""
         
@@ -163,6 +325,10 @@ class Scatter(Series):
         if len(raw_data) == 0:
             return
         
+        # draw density
+        if self._draw_density(canvas, source, overrides):
+            return
+        
         # scale coords
         x_data = x_scale.scale(x_data)
         y_data = y_scale.scale(y_data)
@@ -171,15 +337,59 @@ class Scatter(Series):
         default_line_color = color.darker(0.2)
         default_fill_color = color
         
+        # draw markers by style
+        marker = self.get_property('marker', native=True)
+        if self._is_batchable(marker, marker_overrides):
+            
+            # get visible points
+            sizes = self._get_sizes(marker, raw_data, marker_overrides)
+            indices = self._cull_points(frame, x_data, y_data, sizes)
+            
+            # get styles
+            styles, groups = self._get_styles(marker, marker_overrides)
+            
+            # keep stacking order of overlapping markers
+            radius = 0.5 * (sizes if numpy.isscalar(sizes) else sizes[indices])
+            x_vis = x_data[indices]
+            y_vis = y_data[indices]
+            overlap = utils.boxes_overlap(x_vis - radius, y_vis - radius, x_vis + radius, y_vis + radius)
+            split = utils.split_runs if overlap else utils.split_groups
+            
+            # draw markers
+            with canvas.group(tag, "series"):
+                for group, group_indices in split(indices, groups):
+                    
+                    size = sizes if numpy.isscalar(sizes) else sizes[group_indices]
+                    self._draw_batch(canvas, marker, x_data[group_indices], y_data[group_indices], size, styles[group], marker_overrides, default_line_color, default_fill_color)
+            
+            return
+        
+        # get visible points
+        sizes = self._get_sizes(marker, raw_data, marker_overrides)
+        indices = self._cull_points(frame, x_data, y_data, sizes)
+        
+        # get per-point values
+        values = {}
+        if isinstance(marker, Marker):
+            for name in _STYLE_PROPS + ('size',):
+                value = marker.get_property(name, overrides=marker_overrides, native=True)
+                if isinstance(value, Values):
+                    values[name] = value
+        
         # start drawing group
         with canvas.group(tag, "series"):
             
             # draw points
-            for i, data in enumerate(raw_data):
+            for i in indices:
                 
                 # get marker
+                data = raw_data[i]
                 marker = self.get_property('marker', data)
                 
+                # set per-point values
+                for name, value in values.items():
+                    marker_overrides[name] = marker_overrides_fin[name] = value[i]
+                
                 # check visibility
                 if not marker or not marker.is_visible(data, marker_overrides):
                     continue
@@ -189,11 +399,6 @@ class Scatter(Series):
                 y = y_data[i]
                 size = marker.get_property('size', data, marker_overrides)
                 
-                # apply clipping
-                bbox = Frame(x-0.5*size, y-0.5*size, size, size)
-                if not frame.overlaps(bbox):
-                    continue
-                
                 # get marker color
                 line_color = marker.get_property('line_color', overrides=marker_overrides, native=True)
                 if line_color is UNDEF:
@@ -212,6 +417,303 @@ class Scatter(Series):
                 
                 # draw marker
                 marker.draw(canvas, data, **marker_overrides_fin)
+    
+    
+    def _draw_density(self, canvas, source, overrides):
+        """Draws points density if enabled or necessary."""
+        
+        # get properties
+        tag = self.get_property('tag', source, overrides)
+        x_scale = self.get_property('x_scale', source, overrides)
+        y_scale = self.get_property('y_scale', source, overrides)
+        density = self.get_property('density', source, overrides)
+        density_limit = self.get_property('density_limit', source, overrides)
+        density_resolution = self.get_property('density_resolution', source, overrides)
+        density_bar = self.get_property('density_bar', source, overrides)
+        
+        # check density
+        if density is False:
+            return False
+        
+        if density is UNDEF and len(self._raw_data) <= density_limit:
+            return False
+        
+        # get device grid
+        x_range = (min(x_scale.out_range), max(x_scale.out_range))
+        y_range = (min(y_scale.out_range), max(y_scale.out_range))
+        
+        resolution = max(density_resolution, 1)
+        cols = max(1, int((x_range[1] - x_range[0]) / resolution))
+        rows = max(1, int((y_range[1] - y_range[0]) / resolution))
+        
+        # count visible points
+        counts = utils.calc_density(self._x_data, self._y_data, x_range, y_range, (rows, cols), x_scale, y_scale)
+        
+        if density is UNDEF and counts.sum() <= density_limit:
+            return False
+        
+        # init heatmap
+        if self._density is None:
+            self._density = Heatmap(x_scale=LinScale(), y_scale=LinScale())
+        
+        # update heatmap in device units
+        heatmap = self._density
+        heatmap.x_scale.in_range = x_range
+        heatmap.x_scale.out_range = x_range
+        heatmap.y_scale.in_range = y_range
+        heatmap.y_scale.out_range = y_range
+        heatmap.set_data(numpy.where(counts > 0, counts, numpy.nan), x_range, y_range)
+        
+        # set overrides
+        heatmap_overrides = {
+            'tag': tag,
+            'resolution': resolution}
+        
+        if density_bar:
+            heatmap_overrides['color_bar'] = density_bar
+        
+        # draw heatmap
+        heatmap.draw(canvas, **heatmap_overrides)
+        
+        return True
+    
+    
+    def _cull_points(self, frame, x_data, y_data, sizes):
+        """Gets visible points culled by maximum size first."""
+        
+        # use common size
+        if numpy.isscalar(sizes):
+            return utils.cull_points(frame, x_data, y_data, sizes)
+        
+        # cull by maximum size
+        indices = utils.cull_points(frame, x_data, y_data, numpy.fmax.reduce(sizes, initial=0))
+        
+        # cull candidates by own size
+        visible = utils.cull_points(frame, x_data[indices], y_data[indices], sizes[indices])
+        
+        return indices[visible]
+    
+    
+    def _get_sizes(self, marker, raw_data, overrides):
+        """Gets marker size for all points."""
+        
+        # get sizes of static marker
+        if isinstance(marker, Marker):
+            
+            # use static size
+            size = marker.get_property('size', overrides=overrides, native=True)
+            if not callable(size):
+                return size
+            
+            # check overrides
+            cache = 'size' not in overrides
+            
+            # use cached sizes
+            if cache and self._sizes is not None:
+                return self._sizes
+            
+            # get sizes
+            sizes = utils.extract_values(marker, 'size', raw_data, overrides)
+            sizes = numpy.asarray(sizes, dtype=numpy.float64)
+            
+            # store cache
+            if cache:
+                self._sizes = sizes
+            
+            return sizes
+        
+        # get size for each point
+        sizes = numpy.zeros(len(raw_data))
+        
+        for i, data in enumerate(raw_data):
+            marker = self.get_property('marker', data)
+            if marker:
+                sizes[i] = marker.get_property('size', data, overrides)
+        
+        return sizes
+    
+    
+    def _get_appended_values(self, count, values):
+        """Checks and combines per-point values of appended points."""
+        
+        marker = self.get_property('marker', native=True)
+        appended = {}
+        
+        for name in _STYLE_PROPS + ('size',):
+            
+            # get current values
+            current = UNDEF
+            if isinstance(marker, Marker):
+                current = marker.get_property(name, native=True)
+            
+            # get new values
+            key = "marker_%s" % name
+            value = values.pop(key, UNDEF)
+            
+            # check values
+            if not isinstance(current, Values):
+                if value is not UNDEF:
+                    message = "The '%s' is not specified as per-point values!" % key
+                    raise ValueError(message)
+                continue
+            
+            if value is UNDEF:
+                message = "The '%s' values must be provided for appended points!" % key
+                raise ValueError(message)
+            
+            value = Values(value)
+            if len(value) != count:
+                message = "Number of '%s' values does not match the appended data size! -> %d vs %d" % (key, len(value), count)
+                raise ValueError(message)
+            
+            # combine values
+            appended[name] = Values(numpy.concatenate((current.values, value.values)))
+        
+        # check unknown values
+        if values:
+            message = "Unknown per-point values! -> %s" % ", ".join(sorted(values))
+            raise ValueError(message)
+        
+        return appended
+    
+    
+    def _get_styles(self, marker, overrides):
+        """Gets unique styles and style index of each point."""
+        
+        # check overrides
+        cache = not any(name in overrides for name in _STYLE_PROPS)
+        
+        # use cached styles
+        if cache and self._styles is not None:
+            return self._styles
+        
+        # group by styles
+        styles = utils.group_styles(marker, _STYLE_PROPS, self._raw_data, overrides)
+        
+        # store cache
+        if cache:
+            self._styles = styles
+        
+        return styles
+    
+    
+    def _is_batchable(self, marker, overrides):
+        """Checks whether all points can be drawn by the same marker type."""
+        
+        # check marker type
+        if not isinstance(marker, Marker):
+            return False
+        
+        if not isinstance(marker, Symbol) and marker.TYPE not in _BATCH_MARKERS:
+            return False
+        
+        # check dynamic properties
+        return utils.is_static(marker, overrides, skip=_STYLE_PROPS+('size',))
+    
+    
+    def _draw_batch(self, canvas, marker, x_data, y_data, size, style, overrides, default_line_color, default_fill_color):
+        """Draws markers directly using common pen and brush."""
+        
+        # check visibility
+        if not marker.is_visible(UNDEF, overrides) or len(x_data) == 0:
+            return
+        
+        # get symbol
+        if isinstance(marker, Symbol):
+            symbol = marker.get_property('path', overrides=overrides)
+            if not symbol:
+                return
+        
+        # set pen and brush
+        canvas.set_properties(style)
+        
+        # set default colors
+        if style['line_color'] is UNDEF:
+            canvas.line_color = default_line_color
+        
+        if style['fill_color'] is UNDEF:
+            canvas.fill_color = default_fill_color
+        
+        # get coords
+        sizes = numpy.broadcast_to(size, x_data.shape)
+        points = zip(x_data.tolist(), y_data.tolist(), sizes.tolist())
+        
+        # draw markers
+        if isinstance(marker, Symbol):
+            for x, y, s in points:
+                canvas.draw_path(symbol.transformed(Matrix().scale(s, s).translate(x, y)))
+        
+        elif marker.TYPE == MARKER_CIRCLE:
+            for x, y, s in points:
+                canvas.draw_circle(x, y, 0.5*s)
+        
+        elif marker.TYPE == MARKER_SQUARE:
+            for x, y, s in points:
+                r = 0.5*s
+                canvas.draw_rect(x-r, y-r, s, s)
+        
+        elif marker.TYPE == MARKER_DIAMOND:
+            for x, y, s in points:
+                r = 0.5*s
+                canvas.draw_polygon(((x, y-r), (x+r, y), (x, y+r), (x-r, y)))
+        
+        elif marker.TYPE == MARKER_TRIANGLE:
+            k = numpy.sqrt(3)/2.
+            for x, y, s in points:
+                r = 0.5*s
+                f = r/k
+                canvas.draw_polygon(((x, y-f), (x+r, y+f*0.5), (x-r, y+f*0.5)))
+        
+        elif marker.TYPE == MARKER_CROSS:
+            for x, y, s in points:
+                r = 0.5*s
+                canvas.draw_line(x-r, y-r, x+r, y+r)
+                canvas.draw_line(x+r, y-r, x-r, y+r)
+        
+        elif marker.TYPE == MARKER_PLUS:
+            for x, y, s in points:
+                r = 0.5*s
+                canvas.draw_line(x-r, y, x+r, y)
+                canvas.draw_line(x, y-r, x, y+r)
+        
+        elif marker.TYPE == MARKER_ASTERISK:
+            k = 0.5*numpy.sqrt(2)
+            for x, y, s in points:
+                r = 0.5*s
+                r2 = r*k
+                canvas.draw_line(x-r, y, x+r, y)
+                canvas.draw_line(x, y-r, x, y+r)
+                canvas.draw_line(x-r2, y-r2, x+r2, y+r2)
+                canvas.draw_line(x-r2, y+r2, x+r2, y-r2)
+    
+    
+    def _on_scatter_property_changed(self, evt):
+        """Called after any property has changed."""
+        
+        # rebind marker
+        if evt.name == 'marker':
+            
+            if isinstance(evt.old_value, Marker):
+                evt.old_value.unbind(EVT_PROPERTY_CHANGED, self._on_marker_property_changed)
+            
+            if isinstance(evt.new_value, Marker):
+                evt.new_value.bind(EVT_PROPERTY_CHANGED, self._on_marker_property_changed)
+            
+            # reset styles
+            self._styles = None
+            self._sizes = None
+    
+    
+    def _on_marker_property_changed(self, evt):
+        """Called after any marker property has changed."""
+        
+        # reset styles
+        if evt.name in _STYLE_PROPS:
+            self._styles = None
+        
+        # reset sizes
+        elif evt.name == 'size':
+            self._sizes = None
 
 
 class Asterisks(Scatter):
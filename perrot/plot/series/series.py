@@ -12,6 +12,10 @@ from pero import Tooltip, TextTooltip
 
 from .. graphics import InGraphics
 from . import utils
+from . data import Buffer, DataSource, Records, SortedIndex
+
+# define constants
+_LAYOUT_PROPS = ('frame', 'x_scale', 'y_scale', 'z_index', 'color', 'title', 'legend', 'label', 'tooltip', 'show_legend', 'show_labels', 'show_tooltip')
 
 
 class Series(InGraphics):
@@ -25,7 +29,7 @@ class Series(InGraphics):
     are applied upon series drawing and limits calculation.
     
     Properties:
-    
+        
         show_legend: bool
             Specifies whether the legend should be shown.
         
@@ -135,12 +139,35 @@ class Series(InGraphics):
             overrides['tooltip'] = TextTooltip(
                 text = lambda d: str(d))
         
+        # init revision
+        self._revision = 0
+        
         # init base
         super().__init__(**overrides)
         
         # lock properties
         self.lock_property('x_mapper')
         self.lock_property('y_mapper')
+        
+        # bind events
+        self.bind(EVT_PROPERTY_CHANGED, self._on_series_property_changed)
+    
+    
+    @property
+    def revision(self):
+        """
+        Gets current revision of the series. The value is incremented each
+        time the data are extracted or appended or any property is changed,
+        so that it can be used to validate cached limits. Properties set by
+        the plot layout on each drawing (e.g. 'frame' or 'x_scale') or used
+        for presentation only do not change the revision.
+        
+        Returns:
+            int
+                Current revision.
+        """
+        
+        return self._revision
     
     
     def get_limits(self, x_range=None, y_range=None, exact=False):
@@ -222,7 +249,7 @@ class Series(InGraphics):
         return None
     
     
-    def make_labels(self, x_data, y_data, raw_data, v_flip=False, h_flip=False):
+    def make_labels(self, x_data, y_data, raw_data, v_flip=False, h_flip=False, x_sorted=False):
         """
         Prepares labels for given data range.
         
@@ -233,7 +260,7 @@ class Series(InGraphics):
             y_data: 1D numpy.ndarray
                 Y-coordinate data.
             
-            raw_data: 1D numpy.ndarray
+            raw_data: perrot.plot.Records
                 Original data points.
             
             v_flip: bool
@@ -243,6 +270,10 @@ class Series(InGraphics):
             h_flip: bool
                 If set to True, x_offset and text alignment are flipped to their
                 complementary values.
+            
+            x_sorted: bool
+                If set to True, x-coordinates are expected to be sorted
+                ascendantly so that they can be cropped without sorting.
         
         Returns:
             (pero.Label,)
@@ -256,13 +287,15 @@ class Series(InGraphics):
             return labels
         
         # crop data
-        x_data, y_data, raw_data = utils.crop_points(
-            data = (x_data, y_data, raw_data),
-            crops = (self.x_scale.in_range, self.y_scale.in_range),
-            extend = False)
+        x_data, y_data, indices = self._crop_points(
+            x_data = x_data,
+            y_data = y_data,
+            x_range = self.x_scale.in_range,
+            y_range = self.y_scale.in_range,
+            x_sorted = x_sorted)
         
         # check data
-        if len(raw_data) == 0:
+        if len(indices) == 0:
             return labels
         
         # scale coords
@@ -270,9 +303,9 @@ class Series(InGraphics):
         y_data = self.y_scale.scale(y_data)
         
         # create labels
-        for i in range(len(raw_data)):
+        for i, idx in enumerate(indices):
             overrides = {'x': x_data[i], 'y': y_data[i]}
-            labels.append(self.label.clone(raw_data[i], overrides))
+            labels.append(self.label.clone(raw_data[idx], overrides))
         
         # apply veritcal flip
         if v_flip:
@@ -295,7 +328,7 @@ class Series(InGraphics):
         return labels
     
     
-    def make_tooltip(self, x_data, y_data, raw_data, x, y, limit):
+    def make_tooltip(self, x_data, y_data, raw_data, x, y, limit, x_sorted=False):
         """
         Prepares nearest data point tooltip within limits from cursor position.
         
@@ -306,7 +339,7 @@ class Series(InGraphics):
             y_data: 1D numpy.ndarray
                 Y-coordinate data.
             
-            raw_data: 1D numpy.ndarray
+            raw_data: perrot.plot.Records
                 Original data points.
             
             x: int or float
@@ -317,6 +350,10 @@ class Series(InGraphics):
             
             limit: int or float
                 Maximum allowed distance in device units.
+            
+            x_sorted: bool
+                If set to True, x-coordinates are expected to be sorted
+                ascendantly so that they can be cropped without sorting.
         
         Returns:
             pero.Tooltip or None
@@ -334,13 +371,15 @@ class Series(InGraphics):
         max_y = self.y_scale.invert(y-limit)
         
         # crop data
-        x_data, y_data, raw_data = utils.crop_points(
-            data = (x_data, y_data, raw_data),
-            crops = ((min_x, max_x), (min_y, max_y)),
-            extend = False)
+        x_data, y_data, indices = self._crop_points(
+            x_data = x_data,
+            y_data = y_data,
+            x_range = (min_x, max_x),
+            y_range = (min_y, max_y),
+            x_sorted = x_sorted)
         
         # check data
-        if len(raw_data) == 0:
+        if len(indices) == 0:
             return None
         
         # scale coords
@@ -364,7 +403,7 @@ class Series(InGraphics):
             'z_index': 1./dist[idx]}
         
         # make tooltip
-        return self.tooltip.clone(raw_data[idx], overrides)
+        return self.tooltip.clone(raw_data[indices[idx]], overrides)
     
     
     def extract_data(self):
@@ -373,6 +412,21 @@ class Series(InGraphics):
         raise NotImplementedError("The 'extract_data' method is not implemented for '%s'." % self.__class__.__name__)
     
     
+    def append(self, data=UNDEF, **values):
+        """
+        Appends new data points to the series.
+        
+        Args:
+            data: (any,), numpy.ndarray or UNDEF
+                Raw data points to append.
+            
+            values: key:(float,)
+                Coordinates of the points to append.
+        """
+        
+        raise NotImplementedError("The 'append' method is not implemented for '%s'." % self.__class__.__name__)
+    
+    
     def finalize_limits(self, limits, exact):
         """
         Finalizes given x and y data limits by applying margins etc.
@@ -393,11 +447,11 @@ class Series(InGraphics):
         if limits is None:
             return None
         
-        # break links
+        # break links and ensure native floats
         limits = list(limits)
         for i, item in enumerate(limits):
             if item is not None:
-                limits[i] = list(item)
+                limits[i] = [float(v) for v in item]
         
         # add margin to x and y axes
         if self.margin and not exact:
@@ -419,3 +473,201 @@ class Series(InGraphics):
                 item[1] += item[1]*0.1
         
         return limits
+    
+    
+    def _crop_points(self, x_data, y_data, x_range, y_range, x_sorted):
+        """Crops points by given ranges and provides their original indices."""
+        
+        offset = 0
+        
+        # crop sorted data directly
+        if x_sorted:
+            i1, i2 = utils.crop_indices(x_data, x_range, False)
+            x_data = x_data[i1:i2]
+            y_data = y_data[i1:i2]
+            x_range = None
+            offset = i1
+        
+        # crop data
+        return utils.crop_points(
+            data = (x_data, y_data, numpy.arange(offset, offset+len(x_data))),
+            crops = (x_range, y_range),
+            extend = False)
+    
+    
+    def _get_sorted(self, names):
+        """Gets sorted indices of given coordinates created on first use."""
+        
+        # init indices
+        if self._sorted is None:
+            self._sorted = {}
+        
+        # get indices
+        for name in names:
+            if name not in self._sorted:
+                self._sorted[name] = SortedIndex(getattr(self, '_%s_data' % name))
+        
+        return tuple(self._sorted[name] for name in names)
+    
+    
+    def _extract_appended(self, names, data, values):
+        """Extracts final and raw coordinates of points to be appended."""
+        
+        # check raw data
+        if isinstance(self.data, (dict, DataSource)):
+            raise ValueError("Cannot append points to columnar data!")
+        
+        if self.data is not UNDEF and data is UNDEF:
+            raise ValueError("Raw data must be provided for appended points!")
+        
+        # get size
+        if data is not UNDEF:
+            size = len(data)
+        else:
+            sizes = [len(v) for v in values.values() if isinstance(v, (list, tuple, numpy.ndarray))]
+            size = max(sizes) if sizes else 1
+        
+        final = {}
+        raw = {}
+        
+        for name in names:
+            
+            # get values or selector
+            if values.get(name, UNDEF) is not UNDEF:
+                prop = values[name]
+            
+            else:
+                prop = self.get_property(name, native=True)
+                if data is UNDEF or isinstance(prop, (list, tuple, numpy.ndarray)):
+                    raise ValueError("Missing '%s' values for appended points!" % name)
+            
+            # extract raw values
+            raw[name] = utils.extract_raw(prop, data, size)
+            if len(raw[name]) != size:
+                raise ValueError("Inconsistent data length for '%s' values!" % name)
+            
+            # apply mapper
+            mapper = self.x_mapper if name[0] == 'x' else self.y_mapper
+            final[name] = numpy.asarray(mapper.scale(raw[name])) if mapper else raw[name]
+            final[name] = final[name].astype(numpy.float64, copy=False)
+        
+        return final, raw
+    
+    
+    def _append_data(self, names, data, final, raw):
+        """Appends extracted points into data buffers."""
+        
+        # init buffers from current data
+        if self._buffers is None:
+            self._init_buffers(names)
+        
+        # append final values
+        for name in names:
+            buff = self._buffers[name]
+            buff.append(final[name].astype(buff.dtype, copy=False))
+        
+        # append raw data
+        items = self._buffers['data']
+        
+        if isinstance(items, list):
+            items.extend(data)
+        
+        elif isinstance(items, Buffer):
+            items.append(data)
+        
+        else:
+            for name in names:
+                if self._buffers['raw', name] is not None:
+                    self._buffers['raw', name].append(raw[name])
+        
+        # update data
+        self._update_buffers(names)
+    
+    
+    def _sort_buffers(self, names, order):
+        """Reorders all data buffers by given indices."""
+        
+        for buff in self._buffers.values():
+            
+            if isinstance(buff, Buffer):
+                buff.take(order)
+            
+            elif isinstance(buff, list):
+                buff[:] = [buff[i] for i in order]
+        
+        # update data
+        self._update_buffers(names)
+    
+    
+    def _init_buffers(self, names):
+        """Initializes growable data buffers from current data."""
+        
+        records = self._raw_data
+        self._buffers = {}
+        
+        # init final values
+        for name in names:
+            self._buffers[name] = Buffer(getattr(self, '_%s_data' % name))
+        
+        # init raw data items
+        if records.columns is None:
+            
+            if isinstance(records.data, numpy.ndarray):
+                self._buffers['data'] = Buffer(numpy.asarray(records))
+            else:
+                self._buffers['data'] = list(records)
+            
+            return
+        
+        # init raw columns
+        self._buffers['data'] = None
+        
+        for name, column in zip(names, records.columns):
+            
+            if records.indices is not None:
+                column = numpy.asarray(column)[records.indices]
+            
+            # share buffer with final values if same
+            mapper = self.x_mapper if name[0] == 'x' else self.y_mapper
+            if mapper is None and column.dtype == self._buffers[name].data.dtype:
+                self._buffers['raw', name] = None
+            else:
+                self._buffers['raw', name] = Buffer(column)
+    
+    
+    def _update_buffers(self, names):
+        """Sets current data from growable data buffers."""
+        
+        # update revision
+        self._revision += 1
+        
+        # set final values
+        for name in names:
+            setattr(self, '_%s_data' % name, self._buffers[name].data)
+        
+        # set raw data items
+        items = self._buffers['data']
+        
+        if isinstance(items, list):
+            self._raw_data = Records(items)
+        
+        elif isinstance(items, Buffer):
+            self._raw_data = Records(items.data)
+        
+        else:
+            columns = []
+            for name in names:
+                buff = self._buffers['raw', name]
+                if buff is None:
+                    buff = self._buffers[name]
+                columns.append(buff.data)
+            
+            self._raw_data = Records(columns=tuple(columns))
+    
+    
+    def _on_series_property_changed(self, evt):
+        """Called after any property has changed."""
+        
+        # update revision
+        if evt.name not in _LAYOUT_PROPS:
+            self._revision += 1
@@ -2,8 +2,15 @@
 #  Copyright (c) Martin Strohalm. All rights reserved.
 
 import numpy
+from collections.abc import Mapping
 
-from pero import UNDEF
+from pero import UNDEF, Color
+
+from .. enums import *
+from . data import Column, DataSource, QuantizedArray, Records, Values
+
+# define constants
+CHUNK_SIZE = 1048576
 
 
 def crop_indices(data, crop, extend):
@@ -33,23 +40,90 @@ def crop_indices(data, crop, extend):
         return 0, len(data)
     
     # ensure numpy array
-    if not isinstance(data, numpy.ndarray):
+    if isinstance(data, (list, tuple)):
         data = numpy.array(data)
     
+    # use codes of quantized data
+    if isinstance(data, QuantizedArray):
+        crop = [(c - data.offset) / data.scale for c in crop]
+        data = data.codes
+    
     # get indices
-    left_idx = numpy.searchsorted(data, crop[0], side='left')
-    right_idx = numpy.searchsorted(data, crop[1], side='right')
+    left_idx = search_sorted(data, crop[0], side='left')
+    right_idx = search_sorted(data, crop[1], side='right')
     
     # extend range by adjacent values
     if extend and left_idx > 0:
-        left_idx = numpy.searchsorted(data[:left_idx], data[left_idx-1], side='left')
+        left_idx = search_sorted(data, data[left_idx-1], side='left')
     
     if extend and right_idx < len(data):
-        right_idx += numpy.searchsorted(data[right_idx:], data[right_idx], side='right')
+        right_idx = search_sorted(data, data[right_idx], side='right')
     
     return left_idx, right_idx
 
 
+def search_sorted(data, value, side='left'):
+    """
+    Finds the index into sorted data, where given value should be inserted to
+    maintain the order, similar to numpy.searchsorted. In contrast to it, the
+    data are never cast to common type with the value, so that memory-mapped
+    data of narrower type are not loaded as a whole.
+    
+    Args:
+        data: 1D numpy.ndarray
+            Sorted data to search.
+        
+        value: int or float
+            Value to search for.
+        
+        side: str
+            Specifies which index to use if value is found ('left' or 'right').
+    
+    Returns:
+        int
+            Insertion index.
+    """
+    
+    # search in codes
+    if isinstance(data, QuantizedArray):
+        value = (value - data.offset) / data.scale
+        data = data.codes
+    
+    # search directly
+    if data.dtype == numpy.float64 or not numpy.issubdtype(data.dtype, numpy.number):
+        return numpy.searchsorted(data, value, side=side)
+    
+    # check edges
+    size = len(data)
+    if size == 0 or value < data[0]:
+        return 0
+    
+    if value > data[-1]:
+        return size
+    
+    # search by value in data type
+    idx = numpy.searchsorted(data, data.dtype.type(value), side=side)
+    
+    # fix index shifted by rounding
+    if side == 'left':
+        
+        while idx < size and data[idx] < value:
+            idx = numpy.searchsorted(data, data[idx], side='right')
+        
+        while idx > 0 and data[idx-1] >= value:
+            idx = numpy.searchsorted(data, data[idx-1], side='left')
+    
+    else:
+        
+        while idx < size and data[idx] <= value:
+            idx = numpy.searchsorted(data, data[idx], side='right')
+        
+        while idx > 0 and data[idx-1] > value:
+            idx = numpy.searchsorted(data, data[idx-1], side='left')
+    
+    return idx
+
+
 def crop_points(data, crops, extend=False):
     """
     Crops given data by applying specified ranges and optionally extends
@@ -78,7 +152,7 @@ def crop_points(data, crops, extend=False):
     
     # ensure numpy arrays
     for i, d in enumerate(data):
-        if d is not None and not isinstance(d, numpy.ndarray):
+        if isinstance(d, (list, tuple)):
             data[i] = numpy.array(d)
     
     # crop data
@@ -137,7 +211,7 @@ def crop_profile(data, crop, extend=False, master=0):
     
     # ensure numpy arrays
     for i, d in enumerate(data):
-        if d is not None and not isinstance(d, numpy.ndarray):
+        if isinstance(d, (list, tuple)):
             data[i] = numpy.array(d)
     
     # get crop indices from first item
@@ -151,9 +225,193 @@ def crop_profile(data, crop, extend=False, master=0):
     return data
 
 
+def cull_points(frame, x_data, y_data, size=0):
+    """
+    Gets indices of points, which are visible within given frame considering
+    their size.
+    
+    Args:
+        frame: pero.Frame
+            Visible area in device units.
+        
+        x_data: 1D numpy.ndarray
+            X-coordinates of the points in device units.
+        
+        y_data: 1D numpy.ndarray
+            Y-coordinates of the points in device units.
+        
+        size: float or 1D numpy.ndarray
+            Size of the points in device units.
+    
+    Returns:
+        1D numpy.ndarray
+            Indices of visible points.
+    """
+    
+    radius = 0.5 * numpy.asarray(size)
+    
+    return cull_boxes(frame, x_data-radius, y_data-radius, x_data+radius, y_data+radius)
+
+
+def calc_density(x_data, y_data, x_range, y_range, shape, x_scale=None, y_scale=None, chunk=CHUNK_SIZE):
+    """
+    Counts points within each cell of a regular grid spanning given ranges.
+    Points outside the ranges are ignored. If scales are provided, the points
+    are converted by them before counting, so that the grid is regular in
+    the scaled units (e.g. device units of a log axis) and the ranges are
+    expected in the same units.
+    
+    Args:
+        x_data: 1D numpy.ndarray
+            X-coordinates of the points.
+        
+        y_data: 1D numpy.ndarray
+            Y-coordinates of the points.
+        
+        x_range: (float, float)
+            Range of the grid along x-axis.
+        
+        y_range: (float, float)
+            Range of the grid along y-axis.
+        
+        shape: (int, int)
+            Number of rows and columns of the grid.
+        
+        x_scale: pero.Scale or None
+            Scale to convert x-coordinates before counting.
+        
+        y_scale: pero.Scale or None
+            Scale to convert y-coordinates before counting.
+        
+        chunk: int
+            Maximum number of points processed at once.
+    
+    Returns:
+        2D numpy.ndarray
+            Number of points within each cell as rows along the y-axis.
+    """
+    
+    rows, cols = shape
+    counts = numpy.zeros(rows * cols, dtype=numpy.int64)
+    
+    # get bin scales
+    x_lo, x_hi = min(x_range), max(x_range)
+    y_lo, y_hi = min(y_range), max(y_range)
+    
+    x_step = cols / (x_hi - x_lo) if x_hi > x_lo else 0.
+    y_step = rows / (y_hi - y_lo) if y_hi > y_lo else 0.
+    
+    # process chunks
+    for i in range(0, len(x_data), chunk):
+        
+        x = numpy.asarray(x_data[i:i+chunk], dtype=numpy.float64)
+        y = numpy.asarray(y_data[i:i+chunk], dtype=numpy.float64)
+        
+        # scale coords
+        if x_scale is not None:
+            x = x_scale.scale(x)
+        
+        if y_scale is not None:
+            y = y_scale.scale(y)
+        
+        # remove outside points
+        mask = (x >= x_lo) & (x <= x_hi) & (y >= y_lo) & (y <= y_hi)
+        
+        # get bins
+        c = numpy.minimum(((x[mask] - x_lo) * x_step).astype(numpy.int64), cols - 1)
+        r = numpy.minimum(((y[mask] - y_lo) * y_step).astype(numpy.int64), rows - 1)
+        
+        counts += numpy.bincount(r * cols + c, minlength=rows * cols)
+    
+    return counts.reshape(rows, cols)
+
+
+def cull_boxes(frame, x1_data, y1_data, x2_data, y2_data):
+    """
+    Gets indices of boxes overlapping given frame. The boxes are defined by
+    any two opposite corners, so the same can be used for rectangles as well
+    as for bounding boxes of line segments.
+    
+    Args:
+        frame: pero.Frame
+            Visible area in device units.
+        
+        x1_data: 1D numpy.ndarray
+            X-coordinates of the first corners in device units.
+        
+        y1_data: 1D numpy.ndarray
+            Y-coordinates of the first corners in device units.
+        
+        x2_data: 1D numpy.ndarray
+            X-coordinates of the second corners in device units.
+        
+        y2_data: 1D numpy.ndarray
+            Y-coordinates of the second corners in device units.
+    
+    Returns:
+        1D numpy.ndarray
+            Indices of visible boxes.
+    """
+    
+    mask = numpy.minimum(x1_data, x2_data) <= frame.x2
+    mask &= numpy.maximum(x1_data, x2_data) >= frame.x1
+    mask &= numpy.minimum(y1_data, y2_data) <= frame.y2
+    mask &= numpy.maximum(y1_data, y2_data) >= frame.y1
+    
+    return numpy.flatnonzero(mask)
+
+
+def boxes_overlap(x1_data, y1_data, x2_data, y2_data):
+    """
+    Checks whether any of given boxes may overlap each other. The boxes are
+    defined by any two opposite corners. The boxes are considered separated if
+    their intervals do not overlap along x or y axis, otherwise overlapping is
+    assumed. Touching boxes are not considered as overlapping.
+    
+    Args:
+        x1_data: 1D numpy.ndarray
+            X-coordinates of the first corners in device units.
+        
+        y1_data: 1D numpy.ndarray
+            Y-coordinates of the first corners in device units.
+        
+        x2_data: 1D numpy.ndarray
+            X-coordinates of the second corners in device units.
+        
+        y2_data: 1D numpy.ndarray
+            Y-coordinates of the second corners in device units.
+    
+    Returns:
+        bool
+            True if any boxes may overlap, False otherwise.
+    """
+    
+    # check size
+    if len(x1_data) < 2:
+        return False
+    
+    # check intervals along each axis
+    for a1_data, a2_data in ((x1_data, x2_data), (y1_data, y2_data)):
+        
+        # sort intervals
+        starts = numpy.minimum(a1_data, a2_data)
+        ends = numpy.maximum(a1_data, a2_data)
+        
+        order = numpy.argsort(starts, kind='stable')
+        starts = starts[order]
+        ends = numpy.maximum.accumulate(ends[order])
+        
+        # check separation
+        if numpy.all(starts[1:] >= ends[:-1]):
+            return False
+    
+    return True
+
+
 def calc_limits(*data):
     """
-    Calculates limits for each data set in collection.
+    Calculates limits for each data set in collection. Missing values (NaN)
+    are ignored.
     
     Args:
         data: (1D numpy.ndarray,)
@@ -169,10 +427,11 @@ def calc_limits(*data):
     for d in data:
         if d is None or len(d) == 0:
             limits.append(None)
-        elif isinstance(d, numpy.ndarray):
-            limits.append([d.min(), d.max()])
-        else:
+        elif isinstance(d, (list, tuple)):
             limits.append([min(d), max(d)])
+        else:
+            r = calc_range(d)
+            limits.append(list(r) if r is not None else None)
     
     return limits
 
@@ -207,12 +466,16 @@ def combine_limits(*limits):
     return final
 
 
-def calc_points_limits(data, crops, extend=False):
+def calc_points_limits(data, crops, extend=False, indices=None):
     """
     Crops given data by applying specified ranges and optionally extends
     data by adding adjacent points and finally calculates minimum and
     maximum for each data.
     
+    If sorted indices are provided, the first crop is applied by binary
+    search within the presorted data and only the remaining points are
+    sorted for other crops.
+    
     Args:
         data: (1D numpy.ndarray,)
             Data to use.
@@ -222,23 +485,57 @@ def calc_points_limits(data, crops, extend=False):
         
         extend: bool
             If set to True additional adjacent point is added to each side.
+        
+        indices: (perrot.plot.series.data.SortedIndex,) or None
+            Sorted indices for each data item. Items without index can be set
+            to None.
     
     Returns:
         [[float, float],]
             Data limits as series of [min, max] or None for each dimension.
     """
     
+    # apply first crop by sorted index
+    if indices:
+        
+        data = list(data[:])
+        crops = list(crops[:])
+        
+        for i, crop in enumerate(crops):
+            
+            # check crop
+            if crop is None or data[i] is None:
+                continue
+            
+            # check index
+            if indices[i] is None:
+                break
+            
+            # apply crop
+            i1, i2 = crop_indices(indices[i].values, crop, extend)
+            selection = indices[i].indices[i1:i2]
+            
+            for j, d in enumerate(data):
+                if d is not None:
+                    data[j] = numpy.asarray(d)[selection]
+            
+            crops[i] = None
+            break
+    
     data = crop_points(data, crops, extend=extend)
     return calc_limits(*data)
 
 
-def calc_profile_limits(data, crop, extend=False, interpolate=False):
+def calc_profile_limits(data, crop, extend=False, interpolate=False, pyramids=None):
     """
     Crops given data by applying specified range to first data and
     optionally extends data by adding adjacent points and finally calculates
     minimum and maximum for each data. Note that this method assumes the first
     data item to be sorted ascendantly.
     
+    If pyramids are provided, the limits of the cropped data are taken from
+    them instead of scanning all the values.
+    
     Args:
         data: (1D numpy.ndarray,)
             Data to use.
@@ -252,6 +549,10 @@ def calc_profile_limits(data, crop, extend=False, interpolate=False):
         interpolate: bool
             If set to True range extension is done by edge points
             interpolation to provide exact crop.
+        
+        pyramids: (perrot.plot.series.data.Pyramid,) or None
+            Precomputed pyramids for each data item. Items without pyramid
+            can be set to None.
     
     Returns:
         [[float, float],]
@@ -264,16 +565,14 @@ def calc_profile_limits(data, crop, extend=False, interpolate=False):
     
     # no interpolation necessary
     if extend or not interpolate:
-        data = crop_profile(data, crop, extend=extend)
-        return calc_limits(*data)
+        return calc_cropped_limits(data, crop, extend, pyramids)
     
     # get interpolation data
     x_data = data[0]
     y_data = data[1] if len(data) > 1 else None
     
     # get cropped limits
-    data = crop_profile(data, crop, extend=False)
-    limits = calc_limits(*data)
+    limits = calc_cropped_limits(data, crop, False, pyramids)
     
     # get indices
     i1, i2 = crop_indices(x_data, crop, extend=False)
@@ -302,7 +601,9 @@ def calc_profile_limits(data, crop, extend=False, interpolate=False):
             b = y1 - a * x1
             y = a*crop[0] + b
             
-            if limits[1] is None:
+            if numpy.isnan(y):
+                pass
+            elif limits[1] is None:
                 limits[1] = [y, y]
             elif limits[1][0] > y:
                 limits[1][0] = y
@@ -324,7 +625,9 @@ def calc_profile_limits(data, crop, extend=False, interpolate=False):
             b = y1 - a * x1
             y = a*crop[1] + b
             
-            if limits[1] is None:
+            if numpy.isnan(y):
+                pass
+            elif limits[1] is None:
                 limits[1] = [y, y]
             elif limits[1][0] > y:
                 limits[1][0] = y
@@ -334,21 +637,203 @@ def calc_profile_limits(data, crop, extend=False, interpolate=False):
     return limits
 
 
-def is_sorted(data):
+def calc_cropped_limits(data, crop, extend=False, pyramids=None):
+    """
+    Crops given data by applying specified range to first data and
+    calculates minimum and maximum for each data. If pyramids are provided,
+    the limits are taken from them instead of scanning the cropped values.
+    Note that this method assumes the first data item to be sorted
+    ascendantly.
+    
+    Args:
+        data: (1D numpy.ndarray,)
+            Data to use.
+        
+        crop: (float, float)
+            Crop range.
+        
+        extend: bool
+            If set to True additional adjacent point is added to each side.
+        
+        pyramids: (perrot.plot.series.data.Pyramid,) or None
+            Precomputed pyramids for each data item. Items without pyramid
+            can be set to None.
+    
+    Returns:
+        [[float, float],]
+            Data limits as series of [min, max] or None.
+    """
+    
+    # use cropped data
+    if not pyramids:
+        data = crop_profile(data, crop, extend=extend)
+        return calc_limits(*data)
+    
+    # get crop indices
+    i1, i2 = crop_indices(data[0], crop, extend)
+    if i1 == i2:
+        return [None for d in data]
+    
+    # get limits
+    limits = [[data[0][i1], data[0][i2-1]]]
+    
+    for d, pyramid in zip(data[1:], pyramids[1:]):
+        
+        if d is None:
+            limits.append(None)
+        
+        elif pyramid is None:
+            limits += calc_limits(d[i1:i2])
+        
+        else:
+            r = pyramid.get_limits(d, i1, i2)
+            limits.append(list(r) if r is not None else None)
+    
+    return limits
+
+
+def calc_range(data, chunk=CHUNK_SIZE):
     """
-    Checks if given data are sorted ascendantly.
+    Calculates minimum and maximum of given data while ignoring missing values
+    (NaN). The data are processed in chunks so that memory-mapped arrays are
+    never loaded as a whole.
     
     Args:
-        data: (float,)
+        data: 1D numpy.ndarray
+            Data to use.
+        
+        chunk: int
+            Maximum number of values to process at once.
+    
+    Returns:
+        (float, float) or None
+            Data minimum and maximum or None if no valid values.
+    """
+    
+    lo = []
+    hi = []
+    
+    # process chunks
+    for i in range(0, len(data), chunk):
+        
+        part = data[i:i+chunk]
+        
+        if part.dtype.kind == 'f':
+            lo.append(numpy.fmin.reduce(part))
+            hi.append(numpy.fmax.reduce(part))
+        else:
+            lo.append(part.min())
+            hi.append(part.max())
+    
+    # remove missing
+    lo = [v for v in lo if v == v]
+    hi = [v for v in hi if v == v]
+    
+    if not lo:
+        return None
+    
+    return min(lo), max(hi)
+
+
+def split_gaps(*data):
+    """
+    Splits data into continuous segments separated by missing values (NaN) in
+    any of given data items.
+    
+    Args:
+        data: (1D numpy.ndarray,)
             Data to check.
     
+    Returns:
+        ((int, int),)
+            Start and end index of each segment.
+    """
+    
+    # get missing values
+    mask = numpy.isnan(data[0])
+    for d in data[1:]:
+        mask |= numpy.isnan(d)
+    
+    # no gaps
+    if not mask.any():
+        return ((0, len(mask)),) if len(mask) else ()
+    
+    # get segments edges
+    valid = numpy.concatenate(([0], ~mask, [0])).astype(numpy.int8)
+    edges = numpy.flatnonzero(numpy.diff(valid))
+    
+    return tuple(zip(edges[0::2], edges[1::2]))
+
+
+def decimate_points(x_data, y_data, resolution=1.):
+    """
+    Reduces dense continuous line to the first, last, minimum and maximum
+    point within each column of given width (M4 decimation). The resulting
+    polyline is visually identical to the original one while it contains
+    at most four points per column. Note that this method assumes the
+    x-coordinates are in device units, monotonic and without missing values.
+    
+    Args:
+        x_data: 1D numpy.ndarray
+            X-coordinates in device units.
+        
+        y_data: 1D numpy.ndarray
+            Y-coordinates in device units.
+        
+        resolution: int or float
+            Width of the columns in device units.
+    
+    Returns:
+        1D numpy.ndarray or None
+            Sorted indices of the points to keep or None if the data are not
+            dense enough to be reduced.
+    """
+    
+    size = len(x_data)
+    
+    # check density
+    if size < 8 or size <= 4 * (abs(x_data[-1] - x_data[0]) / resolution + 1):
+        return None
+    
+    # get columns
+    columns = numpy.floor(x_data / resolution)
+    bounds = numpy.flatnonzero(columns[1:] != columns[:-1]) + 1
+    
+    starts = numpy.concatenate(([0], bounds))
+    ends = numpy.concatenate((bounds, [size])) - 1
+    groups = numpy.repeat(numpy.arange(len(starts)), numpy.diff(numpy.append(starts, size)))
+    
+    # get first minimum and maximum in each column
+    mins = numpy.flatnonzero(y_data == numpy.minimum.reduceat(y_data, starts)[groups])
+    mins = mins[numpy.concatenate(([True], groups[mins[1:]] != groups[mins[:-1]]))]
+    
+    maxs = numpy.flatnonzero(y_data == numpy.maximum.reduceat(y_data, starts)[groups])
+    maxs = maxs[numpy.concatenate(([True], groups[maxs[1:]] != groups[maxs[:-1]]))]
+    
+    # merge indices
+    return numpy.unique(numpy.concatenate((starts, ends, mins, maxs)))
+
+
+def is_sorted(data, chunk=CHUNK_SIZE):
+    """
+    Checks if given data are sorted ascendantly. The data are processed in
+    chunks so that memory-mapped arrays are never loaded as a whole.
+    
+    Args:
+        data: 1D numpy.ndarray
+            Data to check.
+        
+        chunk: int
+            Maximum number of values to process at once.
+    
     Returns:
         bool
             True if sorted, False otherwise.
     """
     
-    for i in range(data.size-1):
-        if data[i+1] < data[i]:
+    for i in range(0, len(data)-1, chunk):
+        part = data[i:i+chunk+1]
+        if numpy.any(part[1:] < part[:-1]):
             return False
     
     return True
@@ -384,19 +869,39 @@ def extract_data_size(series, *names):
         # get size
         if isinstance(prop, (list, tuple, numpy.ndarray)):
             return len(prop)
+        
+        # get columns size
+        if isinstance(prop, Mapping) and prop:
+            return len(next(iter(prop.values())))
     
     # no data
     return None
 
 
-def extract_data(series, name, source=UNDEF, size=None, mapper=None, dtype=numpy.float64):
+def extract_data(series, name, source=UNDEF, size=None, mapper=None, dtype=numpy.float64, storage=None, mmap=False):
     """
     Extracts specified data coordinates into NumPy array of floats. If data are
     provided as a single value, an array of specified 'size' filled by the value
-    is created. If data are provided as a list, tuple or array, new array is
-    created. If data are provided as a selector, values are extracted from the
-    'source'. Finally, raw data are recalculated by given 'mapper' and cast
-    to specified type.
+    is created. If data are provided as a list or tuple, new array is created.
+    If data are provided as a perrot.plot.Column, whole column is sliced from
+    the 'source' at once. If data are provided as any other selector, values
+    are extracted from the 'source' point by point. Finally, raw data are
+    recalculated by given 'mapper' and cast to specified type.
+    
+    If the 'source' is a perrot.plot.DataSource, data can be also provided as a
+    column name and the final values are retrieved from the source cache, so
+    that they are shared with other series using the same column. For any
+    other 'source' a column name is used as a perrot.plot.Column.
+    
+    If 'mmap' is enabled and data are provided as a path to a .npy file
+    without any 'source', the file is opened as a read-only memory-mapped
+    array. Memory-mapped numbers are kept in their native type to avoid
+    loading them into memory.
+    
+    NumPy arrays are never copied unless the 'mapper' or the 'dtype' requires
+    conversion. Instead, read-only views sharing the memory with the original
+    array are returned, therefore the original array should not be modified
+    afterwards.
     
     Args:
         series: perrot.plot.Series
@@ -405,7 +910,7 @@ def extract_data(series, name, source=UNDEF, size=None, mapper=None, dtype=numpy
         name: str
             Data property name.
         
-        source: (any,) or UNDEF
+        source: (any,), numpy.ndarray, dict, perrot.plot.DataSource or UNDEF
             Collection of data used by data selector.
         
         size: int or None
@@ -416,6 +921,15 @@ def extract_data(series, name, source=UNDEF, size=None, mapper=None, dtype=numpy
         
         dtype: numpy type
             Final data type for values.
+        
+        storage: perrot.plot.STORAGE or None
+            Compact storage type of final values as any item from the
+            perrot.plot.STORAGE enum. If the final values are the same as raw
+            data, the raw data are stored the same way.
+        
+        mmap: bool
+            Specifies whether a path to a .npy file should be opened as
+            memory-mapped array.
     
     Returns:
         (numpy.ndarray, numpy.ndarray)
@@ -433,26 +947,410 @@ def extract_data(series, name, source=UNDEF, size=None, mapper=None, dtype=numpy
     # get property
     prop = series.get_property(name, native=True)
     
-    # extract raw data
-    if isinstance(prop, (int, float)) and size:
-        raw = numpy.full(size, prop)
-    
-    elif isinstance(prop, (list, tuple, numpy.ndarray)):
-        raw = numpy.array(prop)
+    # use shared column
+    if isinstance(source, DataSource) and isinstance(prop, (Column, str)):
+        
+        key = prop.key if isinstance(prop, Column) else prop
+        data, raw = source.extract(key, mapper, dtype)
+        data = store_data(data, storage)
+        
+        # check data
+        if size and len(data) != size:
+            message = "Inconsistent data length for '%s' property!" % name
+            raise ValueError(message)
+        
+        return data, raw
     
-    elif prop != UNDEF and source is not UNDEF:
-        raw = numpy.array([prop(p) for p in source])
+    # extract raw data
+    raw = extract_raw(prop, source, size, mmap)
     
     # apply mapper
-    data = numpy.array(mapper.scale(raw)) if mapper else raw
+    data = numpy.asarray(mapper.scale(raw)) if mapper else raw
     
-    # ensure floats
-    if data.dtype != dtype:
+    # ensure floats but keep memory-mapped numbers
+    if data.dtype != dtype and not is_mapped_number(data):
         data = data.astype(dtype, copy=False)
     
+    # make read-only views
+    shared = data is raw
+    
+    raw = raw.view()
+    raw.flags.writeable = False
+    
+    if shared:
+        data = raw
+    else:
+        data = data.view()
+        data.flags.writeable = False
+    
+    # apply storage
+    if storage not in (None, UNDEF, STORAGE_FLOAT64):
+        data = store_data(data, storage)
+        raw = data if shared else raw
+    
     # check data
     if size and len(data) != size:
         message = "Inconsistent data length for '%s' property!" % name
         raise ValueError(message)
     
     return data, raw
+
+
+def is_mapped_number(data):
+    """
+    Checks if given data are memory-mapped array of numbers.
+    
+    Args:
+        data: numpy.ndarray
+            Data to check.
+    
+    Returns:
+        bool
+            True if memory-mapped numbers, False otherwise.
+    """
+    
+    return isinstance(data, numpy.memmap) and numpy.issubdtype(data.dtype, numpy.number)
+
+
+def extract_raw(prop, source=UNDEF, size=None, mmap=False):
+    """
+    Extracts raw values for given property value.
+    
+    Args:
+        prop: int, float, tuple, list, numpy.ndarray, str, perrot.plot.Column or callable
+            Property value.
+        
+        source: (any,), numpy.ndarray, dict or UNDEF
+            Raw data points.
+        
+        size: int or None
+            Expected data size used to expand single values.
+        
+        mmap: bool
+            Specifies whether a path to a .npy file should be opened as
+            memory-mapped array.
+    
+    Returns:
+        numpy.ndarray
+            Raw values.
+    """
+    
+    if isinstance(prop, (int, float)) and size:
+        return numpy.full(size, prop)
+    
+    if isinstance(prop, numpy.ndarray):
+        return prop
+    
+    if isinstance(prop, (list, tuple)):
+        return numpy.array(prop)
+    
+    if isinstance(prop, Column) and source is not UNDEF:
+        return prop.extract(source)
+    
+    if isinstance(prop, str) and source is not UNDEF:
+        return Column(prop).extract(source)
+    
+    if isinstance(prop, str) and mmap:
+        return numpy.load(prop, mmap_mode='r')
+    
+    if prop is not UNDEF and source is not UNDEF:
+        return numpy.array([prop(p) for p in source])
+    
+    return numpy.array([], dtype=numpy.float64)
+
+
+def store_data(data, storage):
+    """
+    Converts given data into specified compact storage type. Floating point
+    types are stored as read-only arrays, while integer types are stored as
+    perrot.plot.QuantizedArray.
+    
+    Args:
+        data: 1D numpy.ndarray
+            Data to convert.
+        
+        storage: perrot.plot.STORAGE or None
+            Storage type as any item from the perrot.plot.STORAGE enum.
+    
+    Returns:
+        numpy.ndarray or perrot.plot.QuantizedArray
+            Converted data.
+    """
+    
+    # keep data
+    if storage in (None, UNDEF, STORAGE_FLOAT64):
+        return data
+    
+    # store floats
+    if storage == STORAGE_FLOAT32:
+        
+        data = data.astype(numpy.float32, copy=False)
+        data.flags.writeable = False
+        
+        return data
+    
+    # store codes
+    return QuantizedArray(data, dtype=numpy.dtype(storage))
+
+
+def is_static(prop_set, overrides=None, skip=None):
+    """
+    Checks whether all properties of given property set are static, i.e. none
+    of them is a function to be called for individual data points.
+    
+    Args:
+        prop_set: pero.PropertySet
+            Property set to check.
+        
+        overrides: dict or None
+            Highest priority properties to be used instead of current values.
+        
+        skip: (str,) or None
+            Names of properties to be ignored.
+    
+    Returns:
+        bool
+            True if all properties are static, False otherwise.
+    """
+    
+    for prop in prop_set.properties():
+        
+        if skip and prop.name in skip:
+            continue
+        
+        value = prop_set.get_property(prop.name, overrides=overrides, native=True)
+        if callable(value) and not isinstance(value, prop.types):
+            return False
+    
+    return True
+
+
+def extract_values(prop_set, name, raw_data, overrides=None):
+    """
+    Retrieves values of specified dynamic property for all data points.
+    Values given as perrot.plot.Values are used directly, columns are
+    extracted at once if possible, while any other function is called for
+    each data point.
+    
+    Args:
+        prop_set: pero.PropertySet
+            Property set to get the values from.
+        
+        name: str
+            Property name.
+        
+        raw_data: (any,) or perrot.plot.Records
+            Raw data points.
+        
+        overrides: dict or None
+            Highest priority properties to be used instead of current values.
+    
+    Returns:
+        numpy.ndarray or list
+            Values for all data points.
+    """
+    
+    value = prop_set.get_property(name, overrides=overrides, native=True)
+    
+    # use given values
+    if isinstance(value, Values):
+        
+        if len(value) != len(raw_data):
+            message = "Number of '%s' values does not match the data size! -> %d vs %d" % (name, len(value), len(raw_data))
+            raise ValueError(message)
+        
+        return value.values
+    
+    # extract whole column
+    if isinstance(value, Column) and isinstance(raw_data, Records):
+        if raw_data.data is not None and raw_data.indices is None:
+            return value.extract(raw_data.data)
+    
+    # call for each point
+    return [prop_set.get_property(name, d, overrides) for d in raw_data]
+
+
+def encode_values(values):
+    """
+    Finds unique values within given sequence and encodes each value by the
+    index of its unique value. The unique values are kept in the order of
+    their first occurrence. Colors are compared by their RGBA values and rows
+    of 2D arrays are compared as a whole. Note that the codes only identify
+    equal values, drawing points grouped by them changes their stacking order
+    (see 'split_runs').
+    
+    Args:
+        values: numpy.ndarray or list
+            Values to encode.
+    
+    Returns:
+        ([any,], 1D numpy.ndarray)
+            Unique values and index of the unique value for each item.
+    """
+    
+    # use numpy for plain arrays
+    if isinstance(values, numpy.ndarray) and values.dtype != object:
+        
+        uniques, first, codes = numpy.unique(values, axis=0 if values.ndim > 1 else None, return_index=True, return_inverse=True)
+        
+        # keep order of occurrence
+        order = numpy.argsort(first)
+        ranks = numpy.empty(len(order), dtype=int)
+        ranks[order] = numpy.arange(len(order))
+        
+        uniques = [tuple(v) if isinstance(v, list) else v for v in uniques[order].tolist()]
+        
+        return uniques, ranks[codes.reshape(-1)]
+    
+    # encode by keys
+    uniques = []
+    keys = {}
+    codes = numpy.empty(len(values), dtype=int)
+    
+    for i, value in enumerate(values):
+        
+        key = value.rgba if isinstance(value, Color) else tuple(value) if isinstance(value, (list, numpy.ndarray)) else value
+        
+        if key not in keys:
+            keys[key] = len(uniques)
+            uniques.append(value)
+        
+        codes[i] = keys[key]
+    
+    return uniques, codes
+
+
+def group_styles(prop_set, names, raw_data, overrides=None):
+    """
+    Resolves specified style properties of given property set for all data
+    points and groups the points by equal styles. Static properties are
+    resolved only once, while dynamic properties are retrieved as whole
+    columns of values (see 'extract_values').
+    
+    Args:
+        prop_set: pero.PropertySet
+            Property set to get the styles from.
+        
+        names: (str,)
+            Names of style properties.
+        
+        raw_data: (any,) or perrot.plot.Records
+            Raw data points.
+        
+        overrides: dict or None
+            Highest priority properties to be used instead of current values.
+    
+    Returns:
+        ([{str:any},], 1D numpy.ndarray)
+            Unique styles as {name: value} and index of the style for each
+            data point.
+    """
+    
+    props = {p.name: p for p in prop_set.properties()}
+    
+    static = {}
+    dynamic = []
+    
+    # resolve static properties
+    for name in names:
+        
+        value = prop_set.get_property(name, overrides=overrides, native=True)
+        
+        if callable(value) and not isinstance(value, props[name].types):
+            dynamic.append(name)
+        else:
+            static[name] = prop_set.get_property(name, overrides=overrides)
+    
+    # use single style
+    if not dynamic:
+        return [static], numpy.zeros(len(raw_data), dtype=int)
+    
+    # encode dynamic values
+    uniques = []
+    codes = numpy.empty((len(raw_data), len(dynamic)), dtype=int)
+    
+    for i, name in enumerate(dynamic):
+        uniques_i, codes[:, i] = encode_values(extract_values(prop_set, name, raw_data, overrides))
+        uniques.append(uniques_i)
+    
+    # group points by unique combinations
+    combinations, indices = encode_values(codes)
+    
+    # make styles
+    styles = []
+    
+    for combination in combinations:
+        
+        style = static.copy()
+        for name, uniques_i, code in zip(dynamic, uniques, combination):
+            style[name] = props[name].parse(uniques_i[code])
+        
+        styles.append(style)
+    
+    return styles, indices
+
+
+def split_groups(indices, groups):
+    """
+    Sorts given point indices by their group and splits them into individual
+    groups. The original order of points within each group is retained.
+    
+    Args:
+        indices: 1D numpy.ndarray
+            Indices of the points.
+        
+        groups: 1D numpy.ndarray
+            Group index of each point.
+    
+    Returns:
+        ((int, 1D numpy.ndarray),)
+            Group index and point indices of each group.
+    """
+    
+    # check indices
+    if len(indices) == 0:
+        return []
+    
+    # sort by group
+    groups = groups[indices]
+    order = numpy.argsort(groups, kind='stable')
+    indices = indices[order]
+    groups = groups[order]
+    
+    # get bounds
+    bounds = numpy.flatnonzero(numpy.diff(groups)) + 1
+    starts = numpy.concatenate(([0], bounds)).astype(int)
+    ends = numpy.concatenate((bounds, [len(groups)])).astype(int)
+    
+    return [(groups[i1], indices[i1:i2]) for i1, i2 in zip(starts, ends)]
+
+
+def split_runs(indices, groups):
+    """
+    Splits given point indices into runs of consecutive points of the same
+    group. Unlike the 'split_groups' function the original order of all the
+    points is retained, so that overlapping points keep their stacking order.
+    
+    Args:
+        indices: 1D numpy.ndarray
+            Indices of the points.
+        
+        groups: 1D numpy.ndarray
+            Group index of each point.
+    
+    Returns:
+        ((int, 1D numpy.ndarray),)
+            Group index and point indices of each run.
+    """
+    
+    # check indices
+    if len(indices) == 0:
+        return []
+    
+    # get bounds
+    groups = groups[indices]
+    bounds = numpy.flatnonzero(numpy.diff(groups)) + 1
+    starts = numpy.concatenate(([0], bounds)).astype(int)
+    ends = numpy.concatenate((bounds, [len(groups)])).astype(int)
+    
+    return [(groups[i1], indices[i1:i2]) for i1, i2 in zip(starts, ends)]